@@ -0,0 +1,280 @@
+"""检测流水线基准测试
+
+在示例图片和生成的 1080p/4K 帧上测试 DetectionThread.process_frame，
+并用模拟采集源运行完整的 采集 -> 推理 -> 绘制 -> 显示 流水线，
+输出各阶段 p50/p95/p99 耗时、吞吐量和峰值内存，结果保存为JSON便于不同提交间比较。
+不需要显示器和GPU，可在无界面的Linux上运行：
+
+    python benchmarks/bench_pipeline.py --model yolov8n.pt --duration 10
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/旧提交.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import threading
+import subprocess
+from collections import OrderedDict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import (RESOLUTIONS, FakeScreen, load_sample_images,  # noqa: E402
+                                  moving_frames, synthetic_frame)
+from benchmarks.stats import (LatencyRecorder, compare_results, format_summary,  # noqa: E402
+                              peak_rss_mb)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="检测流水线基准测试")
+    parser.add_argument('--model', default='yolov8n.pt', help="模型文件路径")
+    parser.add_argument('--backend', choices=['pytorch', 'onnx', 'openvino'], default='pytorch',
+                        help="推理后端")
+    parser.add_argument('--threads', type=int, default=0, help="CPU推理线程数，0为自动")
+    parser.add_argument('--imgsz', type=int, default=640, help="推理尺寸")
+    parser.add_argument('--precision', choices=['fp32', 'fp16', 'int8'], default='fp32',
+                        help="推理精度，仅onnx/openvino后端有效")
+    parser.add_argument('--calib', default=os.path.join(ROOT, '示例'), help="INT8量化的校准图片目录")
+    parser.add_argument('--conf', type=float, default=0.25, help="置信度阈值")
+    parser.add_argument('--images', default=os.path.join(ROOT, '示例'),
+                        help="process_frame 测试使用的图片目录，为空时跳过")
+    parser.add_argument('--resolutions', default='1080p,4k',
+                        help=f"生成帧的分辨率，逗号分隔，可选 {','.join(RESOLUTIONS)}")
+    parser.add_argument('--boxes', type=int, default=10, help="生成帧中的色块数")
+    parser.add_argument('--iterations', type=int, default=30, help="process_frame 每个场景的测试次数")
+    parser.add_argument('--warmup', type=int, default=3, help="每个场景开始前的预热次数")
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help="完整流水线的测试秒数，0为跳过")
+    parser.add_argument('--pipeline-resolution', default='1080p', help="完整流水线的采集分辨率")
+    parser.add_argument('--target-fps', type=float, default=30,
+                        help="完整流水线的目标帧率（与界面默认相同），0为全速")
+    parser.add_argument('--display-ms', type=float, default=0,
+                        help="模拟界面绘制一帧的耗时（毫秒）")
+    parser.add_argument('--change-threshold', type=float, default=0,
+                        help="静止画面跳过的变化阈值，默认关闭以测量完整推理")
+    parser.add_argument('--tracking', type=int, default=0, help="目标跟踪的检测间隔帧数，0为关闭")
+    parser.add_argument('--tiling', action='store_true', help="开启切片推理")
+    parser.add_argument('--output', help="结果JSON路径，默认 benchmarks/results/<提交>.json")
+    parser.add_argument('--compare', metavar='PATH', help="与之前保存的结果比较")
+    return parser.parse_args()
+
+def git_commit():
+    """返回当前提交的短哈希和工作区是否有未提交的修改"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                cwd=ROOT, capture_output=True, text=True).stdout
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+
+def timed(recorder, stage, func):
+    """包装函数，记录每次调用的耗时"""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            recorder.add(stage, time.perf_counter() - start)
+    return wrapper
+
+def create_thread(model, args):
+    from PyQt5.QtCore import Qt
+    from src.core.detection_thread import DetectionThread
+
+    thread = DetectionThread(model)
+    # 没有Qt事件循环，信号直接在发送线程中处理
+    thread.log_message.connect(lambda message: print(f"  [检测线程] {message}"), Qt.DirectConnection)
+    thread.confidence_threshold = args.conf
+    thread.imgsz = args.imgsz
+    thread.change_detector.threshold = args.change_threshold
+    thread.detect_interval = args.tracking
+    thread.tiling = args.tiling
+    return thread
+
+def bench_process_frame(thread, frames, args):
+    """逐帧调用 process_frame，统计推理、绘制和总耗时"""
+    for index in range(args.warmup):
+        thread.process_frame(frames[index % len(frames)].copy())
+
+    recorder = LatencyRecorder()
+    thread.infer = timed(recorder, 'infer', thread.infer)
+    thread.annotate = timed(recorder, 'annotate', thread.annotate)
+    total = 0.0
+    try:
+        for index in range(args.iterations):
+            frame = frames[index % len(frames)].copy()  # 绘制会修改帧，拷贝不计入耗时
+            start = time.perf_counter()
+            thread.process_frame(frame)
+            elapsed = time.perf_counter() - start
+            recorder.add('total', elapsed)
+            total += elapsed
+    finally:
+        del thread.infer
+        del thread.annotate
+    return {
+        "frames": args.iterations,
+        "frame_size": list(frames[0].shape[:2]),
+        "throughput_fps": args.iterations / max(total, 1e-9),
+        "stages": recorder.summary(),
+    }
+
+def bench_pipeline(thread, frames, args):
+    """用模拟采集源运行完整流水线，统计各阶段耗时、端到端延迟、吞吐量和丢帧"""
+    from PyQt5.QtCore import Qt
+
+    recorder = LatencyRecorder()
+    capture_times = OrderedDict()  # 批次 -> 采集时刻，用于计算端到端延迟
+    last_capture = [None]
+    displayed = [0]
+    grab_frames = thread.grab_frames
+    render = thread.render
+
+    def timed_grab(screen):
+        start = time.perf_counter()
+        captured = grab_frames(screen)
+        recorder.add('capture', time.perf_counter() - start)
+        if captured is not None:
+            capture_times[id(captured[1])] = start
+            while len(capture_times) > 64:  # 被丢弃的帧不会绘制
+                capture_times.popitem(last=False)
+        return captured
+
+    def timed_render(layout, batch, results):
+        last_capture[0] = capture_times.pop(id(batch), None)
+        start = time.perf_counter()
+        try:
+            return render(layout, batch, results)
+        finally:
+            recorder.add('render', time.perf_counter() - start)
+
+    def on_frame(frame, labels):
+        # 模拟界面：发送时刻即为端到端延迟的终点，绘制完成后通知检测线程
+        if last_capture[0] is not None:
+            recorder.add('end_to_end', time.perf_counter() - last_capture[0])
+        displayed[0] += 1
+        if args.display_ms > 0:
+            threading.Timer(args.display_ms / 1000, thread.frame_consumed).start()
+        else:
+            thread.frame_consumed()
+
+    thread.grab_frames = timed_grab
+    thread.render = timed_render
+    thread.infer = timed(recorder, 'infer', thread.infer)
+    thread.detection_complete.connect(on_frame, Qt.DirectConnection)
+    thread.screen_source = lambda: FakeScreen(frames)
+    thread.detect_mode = 'fullscreen'
+    if args.target_fps > 0:
+        thread.frame_pacer.set_mode('target', args.target_fps)
+    else:
+        thread.frame_pacer.set_mode('max')
+
+    worker = threading.Thread(target=thread.run, daemon=True)
+    worker.start()
+    time.sleep(min(2.0, args.duration / 2))  # 预热阶段不计入统计
+    recorder.clear()
+    displayed[0] = 0
+    dropped_start = thread.dropped_frames
+    start = time.perf_counter()
+    time.sleep(args.duration)
+    elapsed = time.perf_counter() - start
+    stages = recorder.summary()
+    displayed_count = displayed[0]
+    dropped = thread.dropped_frames - dropped_start
+    thread.stop()
+    worker.join()
+
+    return {
+        "frames": displayed_count,
+        "frame_size": list(frames[0].shape[:2]),
+        "duration_s": elapsed,
+        "throughput_fps": displayed_count / elapsed,
+        "inference_fps": stages.get('infer', {}).get('count', 0) / elapsed,
+        "dropped": dropped,
+        "stages": stages,
+    }
+
+def main():
+    args = parse_args()
+    from src.core.model_cache import ModelCache
+    from src.core.model_loader import load_model
+
+    commit, dirty = git_commit()
+    start = time.perf_counter()
+    model, backend, precision = load_model(args.model, args.backend, args.threads,
+                                           imgsz=args.imgsz, precision=args.precision,
+                                           cache=ModelCache(), calibration_dir=args.calib)
+    load_time = time.perf_counter() - start
+    print(f"模型: {args.model}  后端: {backend} {precision}  加载耗时: {load_time:.2f}s")
+
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "backend": backend,
+            "precision": precision,
+            "args": vars(args),
+        },
+        "model_load_s": load_time,
+        "scenarios": {},
+    }
+
+    sources = []
+    if args.images:
+        images = load_sample_images(args.images)
+        if images:
+            sources.append(('process_frame/samples', [image for _, image in images]))
+        else:
+            print(f"未找到图片: {args.images}")
+    for name in filter(None, args.resolutions.split(',')):
+        width, height = RESOLUTIONS[name]
+        sources.append((f'process_frame/{name}',
+                        [synthetic_frame(width, height, args.boxes, seed) for seed in range(4)]))
+
+    thread = create_thread(model, args)
+    for name, frames in sources:
+        print(f"测试 {name} ...")
+        result = bench_process_frame(thread, frames, args)
+        report['scenarios'][name] = result
+        print(format_summary(name, result['stages'],
+                             {"吞吐量 (FPS)": result['throughput_fps']}))
+
+    if args.duration > 0:
+        name = f'pipeline/{args.pipeline_resolution}'
+        print(f"测试 {name}，{args.duration:.0f}s ...")
+        width, height = RESOLUTIONS[args.pipeline_resolution]
+        result = bench_pipeline(create_thread(model, args),
+                                moving_frames(width, height, args.boxes), args)
+        report['scenarios'][name] = result
+        print(format_summary(name, result['stages'], {
+            "显示吞吐量 (FPS)": result['throughput_fps'],
+            "推理吞吐量 (FPS)": result['inference_fps'],
+            "丢帧": result['dropped'],
+        }))
+
+    report['peak_rss_mb'] = peak_rss_mb()
+    if report['peak_rss_mb'] is not None:
+        print(f"峰值内存: {report['peak_rss_mb']:.0f} MB")
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results',
+                                         f"{commit}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到: {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        print(f"与 {previous['meta']['commit']} 比较:")
+        print(compare_results(previous, report))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
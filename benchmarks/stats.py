@@ -0,0 +1,82 @@
+import sys
+import threading
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+class LatencyRecorder:
+    """按阶段记录耗时样本，汇总为 p50/p95/p99"""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def clear(self):
+        with self._lock:
+            self.samples = {}
+
+    def summary(self):
+        """返回 {阶段: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}"""
+        with self._lock:
+            samples = {stage: np.array(values) * 1000 for stage, values in self.samples.items()}
+        result = {}
+        for stage, values in samples.items():
+            stats = {"count": int(len(values)), "mean_ms": float(values.mean())}
+            for p in PERCENTILES:
+                stats[f"p{p}_ms"] = float(np.percentile(values, p))
+            stats["max_ms"] = float(values.max())
+            result[stage] = stats
+        return result
+
+def peak_rss_mb():
+    """返回进程的峰值常驻内存（MB），无法获取时返回None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为KB，macOS 为字节
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+def format_summary(name, stages, extra=None):
+    """格式化一个场景的结果表"""
+    lines = [f"== {name}"]
+    lines.append(f"{'阶段':<12}{'次数':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)")
+    for stage, stats in stages.items():
+        lines.append(f"{stage:<12}{stats['count']:>8}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                     f"{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+    for key, value in (extra or {}).items():
+        lines.append(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+    return "\n".join(lines)
+
+def compare_results(old, new):
+    """比较两次基准测试结果，返回各场景各阶段 p50/p95 和吞吐量变化的文本"""
+    lines = []
+    for name, scenario in new['scenarios'].items():
+        previous = old.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        lines.append(f"== {name}")
+        for stage, stats in scenario['stages'].items():
+            before = previous['stages'].get(stage)
+            if before is None:
+                continue
+            changes = []
+            for key in ('p50_ms', 'p95_ms'):
+                delta = (stats[key] - before[key]) / max(before[key], 1e-9) * 100
+                changes.append(f"{key[:3]} {before[key]:.2f} -> {stats[key]:.2f}ms ({delta:+.1f}%)")
+            lines.append(f"  {stage:<12}" + "  ".join(changes))
+        if 'throughput_fps' in scenario and 'throughput_fps' in previous:
+            lines.append(f"  吞吐量 {previous['throughput_fps']:.2f} -> "
+                         f"{scenario['throughput_fps']:.2f} FPS")
+    return "\n".join(lines)
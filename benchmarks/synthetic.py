@@ -0,0 +1,71 @@
+import cv2
+import numpy as np
+from src.utils.image_utils import find_images, read_image
+
+RESOLUTIONS = {
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+    '1440p': (2560, 1440),
+    '4k': (3840, 2160),
+}
+
+def synthetic_frame(width, height, num_boxes=10, seed=0):
+    """生成带渐变背景和 num_boxes 个随机色块的BGR帧"""
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(40, 200, width, dtype=np.float32)
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[:] = gradient[None, :, None].astype(np.uint8)
+    for _ in range(num_boxes):
+        w = int(rng.integers(width // 40, width // 6))
+        h = int(rng.integers(height // 40, height // 6))
+        x = int(rng.integers(0, width - w))
+        y = int(rng.integers(0, height - h))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.rectangle(frame, (x, y), (x + w, y + h), color, -1)
+    return frame
+
+def moving_frames(width, height, num_boxes=10, count=8):
+    """生成一组色块位置各不相同的帧，模拟持续变化的画面"""
+    return [synthetic_frame(width, height, num_boxes, seed) for seed in range(count)]
+
+def load_sample_images(folder):
+    """读取示例图片，返回 [(文件名, BGR图片)]"""
+    images = []
+    for path in find_images(folder):
+        image = read_image(path)
+        if image is not None:
+            images.append((path, image))
+    return images
+
+
+class FakeScreenshot:
+    def __init__(self, bgra):
+        self.raw = bgra
+        self.height, self.width = bgra.shape[:2]
+
+
+class FakeScreen:
+    """模拟 mss 截图源，循环返回预先生成的帧，用于没有显示器的环境
+
+    不包含真实截图的系统开销，采集耗时只反映格式转换和流水线本身
+    """
+
+    def __init__(self, frames):
+        self._frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA) for frame in frames]
+        height, width = frames[0].shape[:2]
+        monitor = {'left': 0, 'top': 0, 'width': width, 'height': height}
+        self.monitors = [dict(monitor), dict(monitor)]
+        self._index = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def grab(self, region):
+        bgra = self._frames[self._index]
+        self._index = (self._index + 1) % len(self._frames)
+        left, top = region['left'], region['top']
+        crop = bgra[top:top + region['height'], left:left + region['width']]
+        return FakeScreenshot(np.ascontiguousarray(crop))
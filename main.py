@@ -1,26 +1,132 @@
+import time
+START_TIME = time.perf_counter()  # 尽早记录启动时刻，用于统计界面启动耗时
 import sys
-import torch
-from PyQt5.QtWidgets import QApplication
+import json
+import atexit
+import argparse
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from src.ui.main_window import YoloDetector
-
-def check_cuda():
-    """检查CUDA是否可用并打印相关信息"""
-    if torch.cuda.is_available():
-        cuda_version = torch.version.cuda
-        device_name = torch.cuda.get_device_name(0)
-        print(f"CUDA 可用 - 版本: {cuda_version}")
-        print(f"GPU 设备: {device_name}")
-        return True
-    else:
-        print("CUDA 不可用 - 使用 CPU 模式")
-        return False
 
-def main():
-    """主程序入口"""
-    # 检查CUDA状态
-    is_cuda_available = check_cuda()
+# torch、ultralytics、PyQt5 等较重的库都在用到时才导入，界面先显示，模型相关的库在后台导入
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="YOLO目标检测")
+    parser.add_argument('--batch', metavar='SOURCE',
+                        help="无界面批量检测：图片目录或通配符，如 \"screenshots/**/*.png\"")
+    parser.add_argument('--serve', action='store_true',
+                        help="无界面检测服务：加载一次模型，通过本机HTTP接口提供检测")
+    parser.add_argument('--port', type=int, default=8765, help="检测服务的端口（仅监听127.0.0.1）")
+    parser.add_argument('--socket', metavar='PATH', help="检测服务改用Unix套接字（仅Linux/macOS）")
+    parser.add_argument('--max-batch', type=int, default=8, help="检测服务合并为一批推理的最大图片数")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0,
+                        help="检测服务收到第一张图片后等待凑批的最长时间（毫秒）")
+    parser.add_argument('--model', default='yolov8s.pt', help="模型文件路径")
+    parser.add_argument('--output', default='detect_output', help="批量检测的输出目录")
+    parser.add_argument('--format', choices=['json', 'csv'], default='json',
+                        help="检测结果文件格式")
+    parser.add_argument('--batch-size', type=int, default=8, help="每次推理的图片数")
+    parser.add_argument('--workers', type=int, default=4, help="图片解码线程数")
+    parser.add_argument('--conf', type=float, default=0.25, help="置信度阈值")
+    parser.add_argument('--backend', choices=['pytorch', 'onnx', 'openvino'],
+                        help="推理后端，默认有GPU时用pytorch，否则用onnx")
+    parser.add_argument('--threads', type=int, default=0, help="CPU推理线程数，0为自动")
+    parser.add_argument('--imgsz', type=int, default=640, help="推理尺寸，如 320/480/640/960/1280")
+    parser.add_argument('--precision', choices=['fp32', 'fp16', 'int8'], default='fp32',
+                        help="推理精度，仅onnx/openvino后端有效")
+    parser.add_argument('--calib', default='示例', help="INT8量化的校准图片目录")
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help="在 127.0.0.1 的该端口提供 Prometheus 指标（/metrics），0为不开启")
+    parser.add_argument('--import-profile', nargs='?', const='-', metavar='PATH',
+                        help="统计各模块的导入耗时（格式同 python -X importtime），"
+                             "程序退出时输出到文件，不指定文件时输出到标准错误")
+    # 未识别的参数留给Qt处理
+    args, _ = parser.parse_known_args()
+    return args
+
+def load_json(path, default):
+    """读取JSON配置文件，不存在或读取失败时返回默认值"""
+    try:
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+    except Exception as e:
+        print(f"读取 {path} 失败: {str(e)}")
+    return default
+
+def load_headless_model(args):
+    """按命令行参数加载模型，返回 (模型, 自定义标签, 类别ID列表)，未设置类别过滤时类别为None"""
+    from src.utils.cuda_utils import check_cuda
+    from src.core.model_loader import default_backend, load_model
+    
+    backend = args.backend or default_backend(check_cuda())
+    model, backend, precision = load_model(args.model, backend, args.threads,
+                                           imgsz=args.imgsz, precision=args.precision,
+                                           calibration_dir=args.calib)
+    print(f"推理后端: {backend} {precision}")
+    
+    # 与界面共用自定义标签和类别过滤
+    custom_labels = load_json('custom_labels.json', {})
+    class_filter = load_json('class_filter.json', None)
+    class_ids = None
+    if class_filter is not None:
+        allowed = set(class_filter)
+        class_ids = [idx for idx, name in model.names.items() if name in allowed]
+    return model, custom_labels, class_ids
+
+def run_batch(args):
+    """无界面批量检测图片"""
+    from src.core.batch_detector import BatchDetector
+    from src.utils.image_utils import find_images
+    
+    model, custom_labels, class_ids = load_headless_model(args)
+    detector = BatchDetector(model, custom_labels, args.conf, class_ids, imgsz=args.imgsz)
+    processed = detector.run(find_images(args.batch), args.output, args.format,
+                             args.batch_size, args.workers)
+    return 0 if processed else 1
+
+def run_server(args):
+    """无界面检测服务：多个程序共用一个预热好的模型，并发请求合并为一批推理"""
+    import numpy as np
+    from src.core.detection_thread import DetectionThread
+    from src.core.detection_server import DetectionService, DetectionServer
+    
+    model, custom_labels, class_ids = load_headless_model(args)
+    detector = DetectionThread(model)
+    detector.log_message.connect(print)
+    detector.confidence_threshold = args.conf
+    detector.imgsz = args.imgsz
+    detector.class_filter = class_ids
+    detector.set_custom_labels(custom_labels)
+    
+    if args.metrics_port:
+        from src.core.metrics import DetectionMetrics, MetricsServer
+        detector.metrics = DetectionMetrics()
+        detector.stage_timings = detector.metrics.stage_timings
+        metrics_server = MetricsServer(detector.metrics, args.metrics_port)
+        metrics_server.start()
+        print(f"指标接口: {metrics_server.url}")
+    
+    # 按推理尺寸预热一次，第一个请求不再承担初始化开销
+    warmup_start = time.perf_counter()
+    detector.infer(np.zeros((args.imgsz, args.imgsz, 3), dtype=np.uint8))
+    print(f"预热耗时: {time.perf_counter() - warmup_start:.2f}s")
+    
+    service = DetectionService(detector, args.model, args.max_batch, args.max_wait_ms)
+    server = DetectionServer(service, args.port, socket_path=args.socket)
+    try:
+        server.start()
+    except OSError as e:
+        print(f"检测服务启动失败: {str(e)}")
+        return 1
+    print(f"检测服务: {server.url}（POST /detect，GET /health），Ctrl+C 退出")
+    server.serve_forever()
+    return 0
+
+def run_gui(args):
+    """启动图形界面，CUDA检查和模型加载在窗口显示后于后台进行"""
+    from PyQt5.QtWidgets import QApplication
+    from src.ui.main_window import YoloDetector
     
     # 创建应用
     app = QApplication(sys.argv)
@@ -29,11 +135,27 @@ def main():
     app.setStyle('Fusion')
     
     # 创建主窗口
-    detector = YoloDetector(is_cuda_available)
+    detector = YoloDetector(start_time=START_TIME, metrics_port=args.metrics_port)
     detector.show()
     
     # 运行应用
-    sys.exit(app.exec_())
+    return app.exec_()
+
+def main():
+    """主程序入口"""
+    args = parse_args()
+    
+    if args.import_profile:
+        from src.utils.import_profiler import ImportProfiler
+        profiler = ImportProfiler()
+        profiler.install()
+        atexit.register(profiler.dump, args.import_profile)
+    
+    if args.batch:
+        sys.exit(run_batch(args))
+    if args.serve:
+        sys.exit(run_server(args))
+    sys.exit(run_gui(args))
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
@@ -0,0 +1,140 @@
+import os
+import csv
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .postprocess import (extract_detections, filter_detections,
+                          build_label_lut, draw_detections, to_records)
+from ..utils.image_utils import read_image, write_image
+
+CSV_FIELDS = ['image', 'label', 'class_id', 'confidence', 'x1', 'y1', 'x2', 'y2']
+
+class DetectionWriter:
+    """逐张写出检测结果，JSON 为图片列表，CSV 为每个目标一行"""
+
+    def __init__(self, path, fmt):
+        self.fmt = fmt
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._count = 0
+        if fmt == 'csv':
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(CSV_FIELDS)
+        else:
+            self._file.write('[\n')
+
+    def write(self, image, detections):
+        """写出一张图片的检测结果"""
+        if self.fmt == 'csv':
+            for det in detections:
+                self._csv.writerow([image, det['label'], det['class_id'], det['confidence'],
+                                    *det['box']])
+        else:
+            if self._count:
+                self._file.write(',\n')
+            json.dump({"image": image, "detections": detections},
+                      self._file, ensure_ascii=False)
+        self._count += 1
+
+    def close(self):
+        if self.fmt != 'csv':
+            self._file.write('\n]\n')
+        self._file.close()
+
+
+class BatchDetector:
+    """无界面批量图片检测：线程池解码、批量推理、写出标注图片和检测结果"""
+
+    def __init__(self, model, custom_labels=None, confidence_threshold=0.25,
+                 class_filter=None, log=print, imgsz=640):
+        self.model = model
+        self.imgsz = imgsz
+        self.custom_labels = custom_labels or {}
+        self.confidence_threshold = confidence_threshold
+        self.class_filter = class_filter
+        self.log = log
+        self._label_lut = build_label_lut(model.names, self.custom_labels)
+
+    def detect_batch(self, frames):
+        """对一批图片推理并绘制，返回每张图片的检测结果列表"""
+        results = self.model(frames,
+                             imgsz=self.imgsz,
+                             conf=self.confidence_threshold,
+                             classes=self.class_filter,
+                             verbose=False)
+        all_detections = []
+        for frame, result in zip(frames, results):
+            boxes, confs, class_ids = filter_detections(
+                *extract_detections(result), self.confidence_threshold)
+            labels = self._label_lut[class_ids].tolist()
+            draw_detections(frame, boxes, confs, labels)
+            all_detections.append(to_records(boxes, confs, class_ids, labels))
+        return all_detections
+
+    def run(self, paths, output_dir, fmt='json', batch_size=8, workers=4):
+        """批量检测图片列表，返回处理的图片数"""
+        if not paths:
+            self.log("未找到图片")
+            return 0
+
+        image_dir = os.path.join(output_dir, 'images')
+        os.makedirs(image_dir, exist_ok=True)
+        result_path = os.path.join(output_dir, f'detections.{fmt}')
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+        writer = DetectionWriter(result_path, fmt)
+
+        self.log(f"共 {len(paths)} 张图片，批大小 {batch_size}，解码线程 {workers}")
+        start_time = time.time()
+        processed = 0
+        failed = 0
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # 预取固定数量的图片，避免一次性解码全部图片占满内存
+            pending = deque()
+            path_iter = iter(paths)
+            for path in path_iter:
+                pending.append((path, pool.submit(read_image, path)))
+                if len(pending) >= batch_size * 2:
+                    break
+
+            writes = deque()
+            while pending:
+                batch_paths, frames = [], []
+                while pending and len(frames) < batch_size:
+                    path, future = pending.popleft()
+                    next_path = next(path_iter, None)
+                    if next_path is not None:
+                        pending.append((next_path, pool.submit(read_image, next_path)))
+                    frame = future.result()
+                    if frame is None:
+                        failed += 1
+                        self.log(f"无法读取图片: {path}")
+                        continue
+                    batch_paths.append(path)
+                    frames.append(frame)
+                if not frames:
+                    continue
+
+                for path, frame, detections in zip(batch_paths, frames, self.detect_batch(frames)):
+                    relative = os.path.relpath(os.path.abspath(path), root)
+                    writes.append(pool.submit(write_image, os.path.join(image_dir, relative), frame))
+                    writer.write(relative.replace(os.sep, '/'), detections)
+
+                # 限制未完成的写入任务数量
+                while len(writes) > batch_size * 2:
+                    writes.popleft().result()
+
+                processed += len(frames)
+                elapsed = time.time() - start_time
+                self.log(f"已处理 {processed}/{len(paths)} 张，{processed / elapsed:.1f} 张/秒")
+
+            for future in writes:
+                future.result()
+
+        writer.close()
+        elapsed = time.time() - start_time
+        self.log(f"批量检测完成: {processed} 张，失败 {failed} 张，耗时 {elapsed:.1f}s，"
+                 f"平均 {processed / max(elapsed, 1e-6):.1f} 张/秒")
+        self.log(f"检测结果已保存到: {result_path}")
+        return processed
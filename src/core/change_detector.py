@@ -0,0 +1,107 @@
+import time
+import cv2
+import numpy as np
+
+DEFAULT_CHANGE_THRESHOLD = 0.0  # 默认关闭，每帧都推理
+SUGGESTED_CHANGE_THRESHOLD = 25.0  # 开启时建议的阈值
+REFRESH_INTERVAL = 1.0  # 复用结果的最长时间（秒），到期后整帧重新推理
+PARTIAL_INFER_AREA = 0.5  # 变化区域不超过整帧的该比例时只推理变化区域
+
+def cover_boxes(rect, boxes, width, height):
+    """扩大矩形直到完全包含与它相交的检测框，返回 (x1, y1, x2, y2)
+
+    只推理局部区域时，跨在区域边界上的目标需要整体重新检测，否则会同时留下旧的完整框和新的残缺框
+    """
+    x1, y1, x2, y2 = rect
+    while len(boxes):
+        hit = ((boxes[:, 0] < x2) & (boxes[:, 2] > x1) & (boxes[:, 1] < y2) & (boxes[:, 3] > y1))
+        if not hit.any():
+            break
+        bx1, by1 = np.floor(boxes[hit, :2].min(axis=0))
+        bx2, by2 = np.ceil(boxes[hit, 2:].max(axis=0))
+        grown = (max(0, min(x1, int(bx1))), max(0, min(y1, int(by1))),
+                 min(width, max(x2, int(bx2))), min(height, max(y2, int(by2))))
+        if grown == (x1, y1, x2, y2):
+            break
+        x1, y1, x2, y2 = grown
+    return x1, y1, x2, y2
+
+
+class ChangeDetector:
+    """画面变化检测：把画面缩成灰度缩略图，按网格比较与上次推理时的最大灰度差
+
+    按网格内差值最大的像素判断，小目标移动时网格的平均差很小，但所在像素的差值明显；
+    每个采集区域分别保存参考缩略图，只在重新推理的网格上更新参考，
+    缓慢的累计变化超过阈值后也会触发推理；缩略图分辨率有限，
+    每隔 refresh_interval 秒整帧重新推理一次，避免漏掉的变化让旧检测框一直留在画面上
+    """
+
+    def __init__(self, threshold=DEFAULT_CHANGE_THRESHOLD, grid=(4, 4), cell_size=16,
+                 refresh_interval=REFRESH_INTERVAL):
+        self.threshold = threshold  # 缩略图像素灰度差（0-255）的阈值，0为关闭
+        self.grid = grid  # (列数, 行数)
+        self.cell_size = cell_size  # 缩略图中每个网格的边长
+        self.refresh_interval = refresh_interval
+        self._references = {}
+        self._refreshed = {}  # 采集区域 -> 上次整帧推理的时刻
+
+    @property
+    def enabled(self):
+        return self.threshold > 0
+
+    def reset(self):
+        """清除所有参考缩略图，下一帧全部重新推理"""
+        self._references.clear()
+        self._refreshed.clear()
+
+    def thumbnail(self, frame):
+        cols, rows = self.grid
+        width, height = cols * self.cell_size, rows * self.cell_size
+        # 先隔行隔列抽样到缩略图的两倍左右再做区域平均，1080p 下耗时约为直接缩放的 1/20
+        step = max(1, min(frame.shape[0] // (height * 2), frame.shape[1] // (width * 2)))
+        small = cv2.resize(frame[::step, ::step], (width, height), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+    def changed_cells(self, key, frame):
+        """返回 (各网格是否变化的 (行, 列) 布尔数组, 缩略图)，没有参考或需要刷新时全部视为变化"""
+        cols, rows = self.grid
+        thumb = self.thumbnail(frame)
+        reference = self._references.get(key)
+        if reference is None or time.monotonic() - self._refreshed[key] >= self.refresh_interval:
+            return np.ones((rows, cols), dtype=bool), thumb
+        size = self.cell_size
+        cell_diff = np.abs(thumb - reference).reshape(rows, size, cols, size).max(axis=(1, 3))
+        return cell_diff > self.threshold, thumb
+
+    def commit(self, key, thumb, cells=None):
+        """把重新推理过的网格写入参考缩略图，cells 为None时更新整幅"""
+        reference = self._references.get(key)
+        if cells is None or reference is None:
+            self._references[key] = thumb
+            self._refreshed[key] = time.monotonic()
+            return
+        size = self.cell_size
+        mask = np.repeat(np.repeat(cells, size, axis=0), size, axis=1)
+        reference[mask] = thumb[mask]
+
+    def cell_rect(self, cells, width, height, margin=0.5):
+        """返回覆盖变化网格的最小矩形 (x1, y1, x2, y2)，四周外扩 margin 个网格"""
+        cols, rows = self.grid
+        row_idx = np.flatnonzero(cells.any(axis=1))
+        col_idx = np.flatnonzero(cells.any(axis=0))
+        cell_w, cell_h = width / cols, height / rows
+        x1 = max(0, int((col_idx[0] - margin) * cell_w))
+        y1 = max(0, int((row_idx[0] - margin) * cell_h))
+        x2 = min(width, int((col_idx[-1] + 1 + margin) * cell_w))
+        y2 = min(height, int((row_idx[-1] + 1 + margin) * cell_h))
+        return x1, y1, x2, y2
+
+    def rect_cells(self, rect, width, height):
+        """返回完全落在矩形内的网格布尔数组"""
+        cols, rows = self.grid
+        x1, y1, x2, y2 = rect
+        xs = np.arange(cols) * width / cols
+        ys = np.arange(rows) * height / rows
+        inside_x = (xs >= x1) & (xs + width / cols <= x2 + 1)
+        inside_y = (ys >= y1) & (ys + height / rows <= y2 + 1)
+        return inside_y[:, None] & inside_x[None, :]
@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import queue
+import socketserver
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import cv2
+import numpy as np
+
+from .postprocess import to_records
+
+DEFAULT_SERVER_HOST = '127.0.0.1'
+DEFAULT_SERVER_PORT = 8765
+DEFAULT_MAX_BATCH = 8
+DEFAULT_MAX_WAIT_MS = 5.0
+MAX_REQUEST_BYTES = 64 * 1024 * 1024  # 单个请求的图片上限
+
+class MicroBatcher:
+    """把并发提交的单张图片合并成一批处理
+
+    收到第一张图片后最多再等 max_wait 秒凑够 max_batch 张，然后调用一次 process_batch；
+    只有一个客户端时延迟最多增加 max_wait，多个客户端同时请求时合并为一次前向推理
+    """
+
+    def __init__(self, process_batch, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT_MS / 1000):
+        self.process_batch = process_batch  # 输入图片列表，返回等长的结果列表
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, frame):
+        """提交一张图片，返回 Future，结果为 process_batch 对应位置的返回值"""
+        future = Future()
+        self._queue.put((frame, future))
+        return future
+
+    def _collect(self):
+        """阻塞等待第一张图片，再在 max_wait 内收集后续图片，返回 [(图片, Future)]"""
+        item = self._queue.get()
+        if item is None:
+            return []
+        batch = [item]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._running = False
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self):
+        while self._running:
+            batch = self._collect()
+            batch = [(frame, future) for frame, future in batch
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                outputs = self.process_batch([frame for frame, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), output in zip(batch, outputs):
+                future.set_result(output)
+
+
+class DetectionService:
+    """共用一个已加载模型的检测服务，推理和后处理复用检测线程的实现"""
+
+    def __init__(self, detector, model_path, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.detector = detector  # 已设置阈值、类别过滤和自定义标签的 DetectionThread，不启动
+        self.model_path = model_path
+        self.batcher = MicroBatcher(self.detect_batch, max_batch, max_wait_ms / 1000)
+
+    def start(self):
+        self.batcher.start()
+
+    def stop(self):
+        self.batcher.stop()
+
+    def detect_batch(self, frames):
+        """对一批图片做一次前向推理，返回每张图片的检测结果列表"""
+        results = self.detector.infer(frames)
+        self.detector.record_inference(results)
+        detections = []
+        for result in results:
+            boxes, confs, class_ids, labels = self.detector.postprocess(result)
+            detections.append(to_records(boxes, confs, class_ids, labels))
+        return detections
+
+    def detect(self, frame, timeout=None):
+        """提交一张BGR图片并等待检测结果"""
+        return self.batcher.submit(frame).result(timeout)
+
+    def info(self):
+        return {
+            "model": os.path.basename(self.model_path),
+            "names": self.detector.model.names,
+            "imgsz": self.detector.imgsz,
+            "confidence": self.detector.confidence_threshold,
+            "max_batch": self.batcher.max_batch,
+            "max_wait_ms": self.batcher.max_wait * 1000,
+            "batches": self.batcher.batches,
+            "images": self.batcher.items,
+        }
+
+
+def decode_image(data):
+    """解码上传的图片文件内容（PNG/JPEG等），返回BGR图片，无法解码时返回None"""
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+def read_shared_image(name, width, height, channels=3):
+    """从共享内存读取 height x width x channels 的BGR(A)图片，拷贝后立即关闭句柄"""
+    from multiprocessing import shared_memory
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == 'posix':
+        # 共享内存归客户端所有，不让本进程退出时的资源跟踪器删除它
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    try:
+        size = width * height * channels
+        if shm.size < size:
+            raise ValueError(f"共享内存大小 {shm.size} 小于图片大小 {size}")
+        frame = np.ndarray((height, width, channels), dtype=np.uint8, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+    if channels == 4:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    return frame
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        """POST /detect：请求体为图片文件，或用 ?shm=名称&width=&height=[&channels=] 指定共享内存；
+        GET /health：返回模型和批处理信息"""
+
+        def send_json(self, status, data):
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if urlparse(self.path).path != '/health':
+                self.send_json(404, {"error": "未知路径"})
+                return
+            self.send_json(200, service.info())
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != '/detect':
+                self.send_json(404, {"error": "未知路径"})
+                return
+            try:
+                frame = self.read_frame(parse_qs(url.query))
+            except (ValueError, KeyError, OSError) as e:
+                self.send_json(400, {"error": str(e)})
+                return
+            if frame is None:
+                self.send_json(400, {"error": "无法解码图片"})
+                return
+
+            start = time.perf_counter()
+            try:
+                detections = service.detect(frame)
+            except Exception as e:
+                self.send_json(500, {"error": f"检测错误: {str(e)}"})
+                return
+            self.send_json(200, {
+                "width": frame.shape[1],
+                "height": frame.shape[0],
+                "detections": detections,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            })
+
+        def read_frame(self, params):
+            if 'shm' in params:
+                return read_shared_image(params['shm'][0], int(params['width'][0]),
+                                         int(params['height'][0]),
+                                         int(params.get('channels', ['3'])[0]))
+            length = int(self.headers.get('Content-Length', 0))
+            if length <= 0:
+                raise ValueError("请求体为空")
+            if length > MAX_REQUEST_BYTES:
+                raise ValueError(f"图片超过 {MAX_REQUEST_BYTES // (1024 * 1024)} MB")
+            return decode_image(self.rfile.read(length))
+
+        def address_string(self):
+            # Unix套接字的客户端地址为空字符串
+            return self.client_address[0] if self.client_address else 'unix'
+
+        def log_message(self, format, *args):
+            pass  # 不在终端输出每个请求的访问日志
+
+    return Handler
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+        def server_bind(self):
+            if os.path.exists(self.server_address):
+                os.unlink(self.server_address)  # 清理上次异常退出留下的套接字文件
+            super().server_bind()
+else:
+    UnixHTTPServer = None
+
+
+class DetectionServer:
+    """在本机TCP端口或Unix套接字上提供检测接口"""
+
+    def __init__(self, service, port=DEFAULT_SERVER_PORT, host=DEFAULT_SERVER_HOST, socket_path=None):
+        self.service = service
+        self.port = port
+        self.host = host
+        self.socket_path = socket_path
+        self._server = None
+
+    @property
+    def url(self):
+        if self.socket_path:
+            return f"unix:{self.socket_path}"
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        handler = make_handler(self.service)
+        if self.socket_path:
+            if UnixHTTPServer is None:
+                raise OSError("当前系统不支持Unix套接字，请改用端口")
+            self._server = UnixHTTPServer(self.socket_path, handler)
+        else:
+            self._server = ThreadingHTTPServer((self.host, self.port), handler)
+            self._server.daemon_threads = True
+        self.service.start()
+
+    def serve_forever(self):
+        """在当前线程处理请求，直到 Ctrl+C 或其他线程调用 stop"""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def stop(self):
+        """从其他线程结束 serve_forever"""
+        if self._server is not None:
+            self._server.shutdown()
+
+    def close(self):
+        if self._server is not None:
+            self._server.server_close()
+            if self.socket_path and os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self._server = None
+        self.service.stop()
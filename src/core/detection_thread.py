@@ -1,14 +1,34 @@
+import os
 import cv2
 import numpy as np
 import mss
 import time
+import itertools
+import threading
 from PyQt5.QtCore import QThread, pyqtSignal
 from ..utils.window_utils import get_window_rect
+from ..utils.monitor_utils import ALL_MONITORS
+from .pipeline import LatestFrameQueue, FrameRingBuffer, END_OF_STREAM
+from .video_io import VideoReader, VideoRecorder, is_stream_source
+from .frame_pacer import FramePacer
+from .imgsz_tuner import DEFAULT_IMGSZ
+from .change_detector import ChangeDetector, PARTIAL_INFER_AREA, cover_boxes
+from .tracker import ObjectTracker, TRACK_LOW_THRESHOLD
+from .tiling import DEFAULT_TILE_OVERLAP, TileScheduler, make_tiles, tiles_containing
+from .stage_timer import StageTimings
+from .postprocess import (Detections, empty_detections, extract_detections, filter_detections,
+                          merge_detections, build_label_lut, draw_detections, to_records)
+from .preview import fit_scale, clip_region, compose_canvas, compose_tiles
 
 class DetectionThread(QThread):
     detection_complete = pyqtSignal(np.ndarray, list)
     log_message = pyqtSignal(str)
     fps_update = pyqtSignal(float)
+    source_labels_update = pyqtSignal(list)  # 多画面检测时各画面的标签 [(名称, 标签列表)]
+    pacing_update = pyqtSignal(int)  # 每秒内超出帧预算的次数
+    dropped_update = pyqtSignal(int)  # 本次检测累计丢弃的帧数
+    skip_update = pyqtSignal(float)  # 每秒内因画面未变化而省去的推理比例
+    track_summary_update = pyqtSignal(list)  # 跟踪模式下各类别的 [(标签, 当前目标数, 累计目标数)]
     
     def __init__(self, model):
         super().__init__()
@@ -16,9 +36,47 @@ class DetectionThread(QThread):
         self.running = False
         self.detect_mode = None
         self.selected_window = None
-        self.selected_monitor = 0
+        self.selected_windows = []  # 窗口检测的窗口列表 [(hwnd, 标题)]
+        self.selected_monitor = 0  # 0为合并的虚拟屏幕，ALL_MONITORS为分别检测每个显示器
+        self.rois = []  # 全屏模式下的检测区域（屏幕坐标），为空时检测整个屏幕
+        self.screen_region = None  # 当前预览对应的屏幕区域
+        self.preview_size = (1920, 1080)  # 预览帧的最大尺寸，由界面按显示区域大小设置
         self.custom_labels = {}
         self.confidence_threshold = 0.25
+        self.class_filter = None  # 允许检测的类别ID列表，None表示全部类别
+        self.imgsz = DEFAULT_IMGSZ  # 推理输入尺寸
+        self.imgsz_tuner = None  # 自动推理尺寸时的调节器
+        self.change_detector = ChangeDetector()  # 画面未变化时复用上次的检测结果
+        self._previous_results = {}  # 各采集区域上次的检测结果
+        self._reset_changes = False
+        self.detect_interval = 0  # 跟踪模式下每N帧检测一次，0为不跟踪
+        self._trackers = {}  # 各采集区域的跟踪器
+        self._track_ids = itertools.count(1)
+        self._seen_tracks = {}  # 各标签累计出现过的轨迹数
+        self._counted_tracks = {}  # 已计入累计数的近期轨迹ID -> 最后出现的时刻
+        self._frames_since_detect = 0
+        self._detect_busy = threading.Event()  # 后台检测尚未完成
+        self._reset_tracks = False
+        self.tiling = False  # 大画面切成推理尺寸的重叠切片分别推理
+        self.tile_overlap = DEFAULT_TILE_OVERLAP
+        self.tile_scheduler = TileScheduler()
+        self._label_lut = None
+        self._label_names = None
+        self.frame_pacer = FramePacer()
+        self.frame_buffers = FrameRingBuffer()
+        self.frame_queue = None
+        self.render_queue = None
+        self.skipped_emits = 0
+        self._frame_in_flight = threading.Event()  # 界面尚未绘制完上一帧
+        self.video_source = None  # 视频文件路径或视频流地址
+        self.frame_skip = 1  # 视频文件每N帧检测一次
+        self.video_batch_size = 4  # 视频连续帧的批量推理大小
+        self.video_output_dir = 'detect_output'
+        self.screen_source = mss.mss  # 截图源，无界面基准测试时替换为模拟的采集源
+        self.stage_timings = StageTimings()  # 各阶段最近的耗时样本
+        self._emit_time = None  # 最近一次发送帧的时刻，用于统计界面收到帧的延迟
+        self.metrics = None  # 设置后记录运行指标（DetectionMetrics）
+        self._reported_dropped = 0
         
     def set_mode(self, mode, window_hwnd=None):
         self.detect_mode = mode
@@ -27,118 +85,798 @@ class DetectionThread(QThread):
             self.log_message.emit("开始全屏检测...")
         elif mode == 'window' and window_hwnd:
             self.log_message.emit(f"开始窗口检测: {self.selected_window_title}")
+        elif mode == 'video':
+            self.log_message.emit(f"开始视频检测: {self.video_source}")
+            
+    def set_video_source(self, source, frame_skip=1):
+        """设置视频文件或视频流地址，frame_skip 为视频文件的检测间隔帧数"""
+        self.video_source = source
+        self.frame_skip = max(1, int(frame_skip))
             
     def set_custom_labels(self, custom_labels):
         self.custom_labels = custom_labels
+        self._label_lut = None
         
     def set_window_title(self, title):
         self.selected_window_title = title
         
+    def set_windows(self, windows):
+        """设置窗口检测的窗口列表 [(hwnd, 标题)]，多个窗口合并为一次批量推理"""
+        self.selected_windows = list(windows)
+        self.set_window_title("、".join(title for _, title in self.selected_windows))
+        
     def set_confidence_threshold(self, threshold):
         self.confidence_threshold = threshold
+        self.reset_changes()
         self.log_message.emit(f"置信度阈值已设置为: {threshold:.2f}")
         
+    def set_class_filter(self, class_ids):
+        self.class_filter = list(class_ids) if class_ids is not None else None
+        self.reset_changes()
+        if self.class_filter is None:
+            self.log_message.emit("检测类别: 全部")
+        else:
+            self.log_message.emit(f"检测类别数已设置为: {len(self.class_filter)}")
+        
+    def set_monitor(self, monitor):
+        self.selected_monitor = monitor
+        if monitor == ALL_MONITORS:
+            self.log_message.emit("显示器: 全部显示器分别检测")
+        elif monitor == 0:
+            self.log_message.emit("显示器: 全部显示器合并检测")
+        else:
+            self.log_message.emit(f"显示器: 显示器 {monitor}")
+        
+    def set_preview_size(self, width, height):
+        """设置预览帧的最大尺寸，检测线程直接输出缩小后的预览"""
+        self.preview_size = (max(1, int(width)), max(1, int(height)))
+        
+    def set_rois(self, rois):
+        """设置全屏模式下的检测区域列表（mss格式，屏幕坐标）"""
+        had_rois = bool(self.rois)
+        self.rois = [dict(roi) for roi in rois]
+        self.reset_changes()
+        if self.rois:
+            self.log_message.emit(f"检测区域已设置: {len(self.rois)} 个")
+        elif had_rois:
+            self.log_message.emit("检测区域已清除，恢复整屏检测")
+        
+    def set_pacing(self, mode, target_fps=None):
+        self.frame_pacer.set_mode(mode, target_fps)
+        if self.imgsz_tuner is not None:
+            self.imgsz_tuner.set_target_fps(self.tuning_fps)
+        self.log_message.emit(f"帧率模式已设置为: {self.frame_pacer.describe()}")
+        
+    @property
+    def tracking(self):
+        return self.detect_interval > 0
+        
+    @property
+    def tuning_fps(self):
+        """自动推理尺寸的目标帧率，全速模式下使用设置的目标帧率，跟踪模式下按检测间隔折算"""
+        interval = self.frame_pacer.frame_interval
+        fps = 1.0 / interval if interval > 0 else self.frame_pacer.target_fps
+        return fps / self.detect_interval if self.tracking else fps
+        
+    def set_tracking(self, detect_interval):
+        """设置跟踪模式：每 detect_interval 帧检测一次，其余帧由跟踪器外推，0为关闭跟踪"""
+        self.detect_interval = max(0, int(detect_interval))
+        if self.imgsz_tuner is not None:
+            self.imgsz_tuner.set_target_fps(self.tuning_fps)
+        self.reset_changes()
+        if self.tracking:
+            self.log_message.emit(f"目标跟踪: 每 {self.detect_interval} 帧检测一次")
+        else:
+            self.log_message.emit("目标跟踪: 关闭")
+        
+    def set_imgsz(self, imgsz, tuner=None):
+        """设置推理尺寸，传入 tuner 时由其根据实际耗时自动调整"""
+        self.imgsz_tuner = tuner
+        if tuner is not None:
+            tuner.set_target_fps(self.tuning_fps)
+            self.imgsz = tuner.imgsz
+            self.log_message.emit(f"推理尺寸: 自动 (当前 {self.imgsz})")
+        else:
+            self.imgsz = imgsz
+            self.log_message.emit(f"推理尺寸: {self.imgsz}")
+        self.reset_changes()
+        
+    def set_change_threshold(self, threshold):
+        """设置画面变化阈值（缩略图像素的灰度差，0-255），0为每帧都推理"""
+        self.change_detector.threshold = max(0.0, float(threshold))
+        self.reset_changes()
+        if self.change_detector.enabled:
+            self.log_message.emit(f"静止画面跳过: 变化阈值 {self.change_detector.threshold:.1f}")
+        else:
+            self.log_message.emit("静止画面跳过: 关闭")
+            
+    def set_tiling(self, enabled, overlap=DEFAULT_TILE_OVERLAP):
+        """设置切片推理：大于推理尺寸的画面切成重叠切片，与整帧一起批量推理后合并结果"""
+        self.tiling = bool(enabled)
+        self.tile_overlap = min(max(0.0, float(overlap)), 0.5)
+        self.tile_scheduler.reset()
+        self.reset_changes()
+        if self.tiling:
+            self.log_message.emit(f"切片推理: 开启 (切片 {self.imgsz}，重叠 {self.tile_overlap:.0%})")
+        else:
+            self.log_message.emit("切片推理: 关闭")
+            
+    def reset_changes(self):
+        """检测参数变化后上次的结果不再可用，下一帧全部重新推理并重新建立轨迹"""
+        self._reset_changes = True
+        self._reset_tracks = True
+        
+    def frame_consumed(self):
+        """界面绘制完一帧后调用，允许发送下一帧"""
+        self._frame_in_flight.clear()
+        
+    def record_paint(self, paint_start):
+        """界面绘制完一帧后调用，记录信号传递到界面的延迟和界面绘制耗时"""
+        now = time.perf_counter()
+        if self._emit_time is not None:
+            self.stage_timings.record('emit', paint_start - self._emit_time)
+            self._emit_time = None
+        self.stage_timings.record('paint', now - paint_start)
+        
+    @property
+    def dropped_frames(self):
+        """累计丢弃的帧数，包括各级队列挤掉的旧帧和界面繁忙时跳过的帧"""
+        dropped = self.skipped_emits
+        for frame_queue in (self.frame_queue, self.render_queue):
+            if frame_queue is not None:
+                dropped += frame_queue.dropped
+        return dropped
+        
     def stop(self):
         self.running = False
         
+    def infer(self, frame, keys=None):
+        """对单帧或一批帧推理，开启切片推理时按切片推理，keys 为各帧的采集区域（用于跳过空切片）"""
+        if self.tiling:
+            return self.infer_tiled(frame if isinstance(frame, list) else [frame], keys)
+        return self.predict(frame)
+        
+    def predict(self, frame):
+        """对单帧或一批帧运行模型推理，置信度阈值和类别过滤在NMS之前生效"""
+        # 跟踪模式需要低分检测框延续被遮挡的目标，显示前再按置信度阈值过滤
+        conf = self.confidence_threshold
+        if self.tracking:
+            conf = min(conf, TRACK_LOW_THRESHOLD)
+        results = self.model(frame,
+                             imgsz=self.imgsz,
+                             conf=conf,
+                             classes=self.class_filter,
+                             verbose=False)
+        self.stage_timings.record_speed(results)
+        return results
+        
+    def infer_tiled(self, frames, keys=None):
+        """切片推理：各帧的整帧和重叠切片合并为一批推理，检测框映射回原图后按类别NMS合并
+
+        整帧推理负责大目标，切片以原始分辨率推理，小目标不会因整帧缩小而漏检；
+        传入 keys 时连续为空的切片自适应跳过
+        """
+        inputs = []
+        owners = []  # 每个输入对应的 (帧序号, 切片序号)，整帧的切片序号为None
+        frame_tiles = []
+        for index, frame in enumerate(frames):
+            h, w = frame.shape[:2]
+            tiles = make_tiles(w, h, self.imgsz, self.tile_overlap)
+            frame_tiles.append(tiles)
+            inputs.append(frame)
+            owners.append((index, None))
+            if len(tiles) == 1:
+                continue
+            selected = range(len(tiles))
+            if keys is not None:
+                selected = self.tile_scheduler.select(keys[index], len(tiles))
+            for tile in selected:
+                x1, y1, x2, y2 = tiles[tile]
+                inputs.append(frame[y1:y2, x1:x2])
+                owners.append((index, tile))
+                
+        outputs = self.predict(inputs)
+        parts = [[] for _ in frames]
+        for (index, tile), result in zip(owners, outputs):
+            boxes, confs, class_ids = extract_detections(result)
+            if tile is None:
+                # 整帧推理在被跳过的切片中发现目标时，下一帧恢复推理这些切片
+                if keys is not None and len(boxes) and len(frame_tiles[index]) > 1:
+                    centers = ((boxes[:, :2] + boxes[:, 2:]) / 2).tolist()
+                    self.tile_scheduler.wake(keys[index],
+                                             tiles_containing(frame_tiles[index], centers))
+            else:
+                if keys is not None:
+                    self.tile_scheduler.report(keys[index], tile, len(boxes) > 0)
+                x1, y1 = frame_tiles[index][tile][:2]
+                boxes = boxes + np.array([x1, y1, x1, y1], dtype=np.float32)
+            parts[index].append((boxes, confs, class_ids))
+        return [merge_detections(part, outputs[0].names) for part in parts]
+        
+    def infer_changed(self, batch):
+        """只对画面有变化的区域推理，返回 (推理结果列表, 省去的推理面积比例)
+
+        未变化的区域复用上次的结果；单个区域只有局部变化时只推理变化部分，
+        再与上次结果中变化部分以外的检测框合并
+        """
+        frames = [frame for frame, _ in batch]
+        keys = [self.region_key(region) for _, region in batch]
+        detector = self.change_detector
+        if not detector.enabled:
+            results = self.infer(frames, keys)
+            self.record_inference(results)
+            return results, 0.0
+        if self._reset_changes:
+            self._reset_changes = False
+            detector.reset()
+            self._previous_results = {}
+            
+        changes = [detector.changed_cells(key, frame) for key, frame in zip(keys, frames)]
+        results = [self._previous_results.get(key) for key in keys]
+        pending = [index for index, (cells, _) in enumerate(changes)
+                   if cells.any() or results[index] is None]
+        total_area = sum(frame.shape[0] * frame.shape[1] for frame in frames)
+        inferred_area = 0
+        
+        if len(pending) == 1 and results[pending[0]] is not None:
+            index = pending[0]
+            frame = frames[index]
+            cells, thumb = changes[index]
+            h, w = frame.shape[:2]
+            rect = cover_boxes(detector.cell_rect(cells, w, h),
+                               extract_detections(results[index])[0], w, h)
+            area = (rect[2] - rect[0]) * (rect[3] - rect[1])
+            if area <= w * h * PARTIAL_INFER_AREA:
+                results[index] = self.infer_region(frame, rect, results[index])
+                self._previous_results[keys[index]] = results[index]
+                detector.commit(keys[index], thumb, detector.rect_cells(rect, w, h))
+                pending = []
+                inferred_area = area
+                
+        if pending:
+            fresh = self.infer([frames[index] for index in pending],
+                               [keys[index] for index in pending])
+            self.record_inference(fresh)
+            for index, result in zip(pending, fresh):
+                # 只保留检测框，不持有推理结果引用的采集帧
+                results[index] = Detections(*extract_detections(result), result.names)
+                self._previous_results[keys[index]] = results[index]
+                detector.commit(keys[index], changes[index][1])
+                inferred_area += frames[index].shape[0] * frames[index].shape[1]
+                
+        return results, 1.0 - inferred_area / max(total_area, 1)
+        
+    def infer_region(self, frame, rect, previous):
+        """只推理帧中的矩形区域，与上次结果中和区域不相交的检测框合并
+
+        rect 需已扩大到包含与它相交的旧检测框（见 cover_boxes），区域内的目标全部由本次推理重新检测
+        """
+        x1, y1, x2, y2 = rect
+        result = self.infer(np.ascontiguousarray(frame[y1:y2, x1:x2]))[0]
+        self.record_inference([result])
+        boxes, confs, class_ids = extract_detections(result)
+        boxes = boxes + np.array([x1, y1, x1, y1], dtype=np.float32)
+        
+        old_boxes, old_confs, old_ids = extract_detections(previous)
+        outside = ~((old_boxes[:, 0] < x2) & (old_boxes[:, 2] > x1) &
+                    (old_boxes[:, 1] < y2) & (old_boxes[:, 3] > y1))
+        return merge_detections([(old_boxes[outside], old_confs[outside], old_ids[outside]),
+                                 (boxes, confs, class_ids)], result.names)
+        
+    def track(self, batch, detect_queue, detected_queue):
+        """跟踪模式：每隔 detect_interval 帧把一批帧交给后台检测，每帧按轨迹外推检测框
+
+        返回 (各区域的检测结果, 本帧是否省去了推理)
+        """
+        now = time.perf_counter()
+        if self._reset_tracks:
+            self._reset_tracks = False
+            self._trackers = {}
+            self._seen_tracks = {}
+            self._counted_tracks = {}
+            self._frames_since_detect = self.detect_interval
+            
+        # 收取后台检测的结果，按检测帧的采集时刻更新轨迹
+        detected = detected_queue.get(timeout=0)
+        while detected is not None:
+            keys, results, timestamp = detected
+            for key, result in zip(keys, results):
+                tracker = self._trackers.get(key)
+                if tracker is None:
+                    tracker = ObjectTracker(self._track_ids)
+                    self._trackers[key] = tracker
+                tracker.high_threshold = self.confidence_threshold
+                tracker.update(*extract_detections(result), timestamp)
+            detected = detected_queue.get(timeout=0)
+            
+        keys = [self.region_key(region) for _, region in batch]
+        self._frames_since_detect += 1
+        submitted = False
+        if not self._detect_busy.is_set() and self._frames_since_detect >= self.detect_interval:
+            # 同一帧还会交给绘制线程，画面放得下时检测框直接画在帧上，后台检测要用拷贝（拷贝也来自缓冲池）
+            detect_batch = []
+            for frame, region in batch:
+                copy = self.frame_buffers.acquire(frame.shape)
+                np.copyto(copy, frame)
+                detect_batch.append((copy, region))
+            self._detect_busy.set()
+            detect_queue.put((detect_batch, keys, now))
+            self._frames_since_detect = 0
+            submitted = True
+            
+        results = []
+        for key in keys:
+            tracker = self._trackers.get(key)
+            if tracker is None or tracker.timestamp is None:
+                results.append(Detections(*empty_detections(), self.model.names,
+                                          np.empty(0, dtype=np.int64)))
+                continue
+            boxes, confs, class_ids, track_ids = tracker.predict(now)
+            keep = confs >= self.confidence_threshold
+            results.append(Detections(boxes[keep], confs[keep], class_ids[keep],
+                                      self.model.names, track_ids[keep]))
+        return results, not submitted
+        
+    def _detect_loop(self, detect_queue, detected_queue):
+        """跟踪模式的检测线程：推理提交的帧，结果交回推理循环更新轨迹"""
+        while self.running:
+            item = detect_queue.get(timeout=0.1)
+            if item is None:
+                continue
+            try:
+                batch, keys, timestamp = item
+                infer_start = time.perf_counter()
+                results, saved = self.infer_changed(batch)
+                detected_queue.put((keys, results, timestamp))
+                if self.imgsz_tuner is not None and not saved:
+                    self.tune_imgsz(time.perf_counter() - infer_start)
+            except Exception as e:
+                self.log_message.emit(f"运行时错误: {str(e)}")
+            finally:
+                self._detect_busy.clear()
+                
+    def summarize_tracks(self, results):
+        """统计各标签当前跟踪到的目标数和累计出现过的目标数"""
+        now = time.perf_counter()
+        current = {}
+        for result in results:
+            track_ids = getattr(result, 'track_ids', None)
+            if track_ids is None:
+                continue
+            _, _, _, labels = self.postprocess(result)
+            for label, track_id in zip(labels, track_ids.tolist()):
+                current[label] = current.get(label, 0) + 1
+                if track_id not in self._counted_tracks:
+                    self._seen_tracks[label] = self._seen_tracks.get(label, 0) + 1
+                self._counted_tracks[track_id] = now
+                
+        # 轨迹ID不会复用，只需记住仍存活或刚出现过的轨迹（绘制队列中可能还有旧结果），长时间运行也不会增长
+        alive = {track.track_id for tracker in list(self._trackers.values())
+                 for track in tracker.tracks}
+        self._counted_tracks = {track_id: seen for track_id, seen in self._counted_tracks.items()
+                                if track_id in alive or now - seen < 1.0}
+        return [(label, current.get(label, 0), count)
+                for label, count in self._seen_tracks.items()]
+        
+    def region_key(self, region):
+        return region['left'], region['top'], region['width'], region['height']
+        
+    def display_labels(self, result, labels):
+        """跟踪模式下在绘制的标签后附加轨迹ID"""
+        track_ids = getattr(result, 'track_ids', None)
+        if track_ids is None:
+            return labels
+        return [f"{label} #{track_id}" for label, track_id in zip(labels, track_ids.tolist())]
+        
+    def postprocess(self, result):
+        """批量过滤单个推理结果，返回 (boxes, confs, class_ids, labels)"""
+        boxes, confs, class_ids = filter_detections(
+            *extract_detections(result), self.confidence_threshold)
+        
+        # 类别ID到显示名称的查找表只在模型或自定义标签变化时重建
+        if self._label_lut is None or self._label_names is not result.names:
+            self._label_lut = build_label_lut(result.names, self.custom_labels)
+            self._label_names = result.names
+        labels = self._label_lut[class_ids].tolist()
+        return boxes, confs, class_ids, labels
+        
+    def annotate(self, frame, results):
+        """在帧上绘制推理结果，返回绘制后的帧和标签列表"""
+        detected_labels = []
+        
+        for result in results:
+            boxes, confs, _, labels = self.postprocess(result)
+            draw_detections(frame, boxes, confs, labels)
+            detected_labels.extend(labels)
+            
+        return frame, detected_labels
+        
     def process_frame(self, frame):
         """处理单帧图像"""
         try:
-            results = self.model(frame)
-            detected_labels = []
-            
-            for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0]
-                    conf = box.conf[0].item()
+            results = self.infer(frame)
+            return self.annotate(frame, results)
+            
+        except Exception as e:
+            self.log_message.emit(f"检测错误: {str(e)}")
+            return frame, []
+            
+    def render(self, layout, batch, results):
+        """按布局绘制一批采集区域的推理结果，返回 (预览帧, 标签列表, 各画面标签)
+
+        各画面标签只在平铺布局下返回 [(名称, 标签列表)]，其余布局为None
+        """
+        if layout == 'tiles':
+            return self.render_tiles(batch, results)
+        if layout == 'canvas':
+            return self.render_canvas(batch, results) + (None,)
+        frame, _ = batch[0]
+        return self.render_single(frame, results) + (None,)
+        
+    def render_single(self, frame, results):
+        """单画面检测：先缩小到预览尺寸，再按缩放比例绘制检测框"""
+        h, w = frame.shape[:2]
+        scale = fit_scale(w, h, *self.preview_size)
+        if scale < 1.0:
+            frame = cv2.resize(frame, (max(1, int(w * scale)), max(1, int(h * scale))),
+                               interpolation=cv2.INTER_AREA)
+            
+        detected_labels = []
+        for result in results:
+            boxes, confs, _, labels = self.postprocess(result)
+            draw_detections(frame, boxes * scale, confs, self.display_labels(result, labels))
+            detected_labels.extend(labels)
+            
+        return frame, detected_labels
+        
+    def render_canvas(self, batch, results):
+        """区域检测：把各区域贴到整屏画布上，检测框映射回屏幕坐标后绘制"""
+        canvas, scale = compose_canvas(self.screen_region, batch, self.preview_size)
+        origin = np.array([self.screen_region['left'], self.screen_region['top']] * 2,
+                          dtype=np.float32)
+        detected_labels = []
+        for (_, region), result in zip(batch, results):
+            boxes, confs, _, labels = self.postprocess(result)
+            offset = np.array([region['left'], region['top']] * 2, dtype=np.float32)
+            screen_boxes = boxes + offset
+            draw_detections(canvas, (screen_boxes - origin) * scale, confs,
+                            self.display_labels(result, labels))
+            detected_labels.extend(labels)
+            
+        return canvas, detected_labels
+        
+    def render_tiles(self, batch, results):
+        """多画面检测：各帧缩小后平铺显示，检测框按各自的缩放比例绘制"""
+        canvas, placements = compose_tiles([frame for frame, _ in batch], self.preview_size)
+        detected_labels = []
+        source_labels = []
+        for (x, y, scale), (_, region), result in zip(placements, batch, results):
+            boxes, confs, _, labels = self.postprocess(result)
+            offset = np.array([x, y, x, y], dtype=np.float32)
+            draw_detections(canvas, boxes * scale + offset, confs,
+                            self.display_labels(result, labels))
+            detected_labels.extend(labels)
+            source_labels.append((region.get('name', ''), labels))
+            
+        return canvas, detected_labels, source_labels
+        
+    def grab(self, screen, region):
+        """截取指定区域并转换为BGR格式"""
+        start_time = time.perf_counter()
+        screenshot = screen.grab(region)
+        grab_time = time.perf_counter()
+        self.stage_timings.record('grab', grab_time - start_time)
+        
+        # 直接包装mss的BGRA缓冲区，转换结果写入缓冲池中空闲的数组
+        bgra = np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(
+            screenshot.height, screenshot.width, 4)
+        frame = self.frame_buffers.acquire((screenshot.height, screenshot.width, 3))
+        frame = cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=frame)
+        self.stage_timings.record('convert', time.perf_counter() - grab_time)
+        return frame
+        
+    def grab_frames(self, screen):
+        """按当前模式截取一批 (帧, 区域)，返回 (布局, 批次)，无法截取时返回None"""
+        if self.detect_mode == 'fullscreen':
+            monitors = screen.monitors
+            if len(monitors) == 0:
+                return None
+                
+            # 分别采集每个物理显示器，合并为一批推理并平铺显示
+            if self.selected_monitor == ALL_MONITORS and len(monitors) > 2:
+                self.screen_region = None
+                return 'tiles', [(self.grab(screen, monitor), dict(monitor, name=f"显示器 {idx}"))
+                                 for idx, monitor in enumerate(monitors[1:], start=1)]
+                                 
+            index = self.selected_monitor
+            if index == ALL_MONITORS or index >= len(monitors):
+                index = 0
+            self.screen_region = monitors[index]
+            if not self.rois:
+                return 'single', [(self.grab(screen, self.screen_region), self.screen_region)]
+                
+            # 只截取用户框选的区域
+            batch = []
+            for roi in self.rois:
+                region = clip_region(roi, self.screen_region)
+                if region:
+                    batch.append((self.grab(screen, region), region))
+            return ('canvas', batch) if batch else None
+        elif self.detect_mode == 'window' and self.selected_windows:
+            batch = []
+            for hwnd, title in self.selected_windows:
+                window_rect = get_window_rect(hwnd)
+                if window_rect:
+                    batch.append((self.grab(screen, window_rect), dict(window_rect, name=title)))
+            if not batch:
+                self.log_message.emit("警告: 无法获取窗口区域，请确保窗口未被最小化")
+                return None
+                
+            # 多个窗口合并为一批推理并平铺显示
+            if len(self.selected_windows) > 1:
+                return 'tiles', batch
+            return 'single', batch
+        else:
+            return None
+            
+    def emit_frame(self, frame, detected_labels, source_labels=None):
+        """界面空闲时发送一帧，界面尚未绘制完上一帧时跳过，返回是否已发送"""
+        if self._frame_in_flight.is_set():
+            self.skipped_emits += 1
+            return False
+        self._frame_in_flight.set()
+        self._emit_time = time.perf_counter()
+        if source_labels is not None:
+            self.source_labels_update.emit(source_labels)
+        self.detection_complete.emit(frame, detected_labels)
+        return True
+        
+    def _capture_loop(self, frame_queue):
+        """采集线程：持续截图，队列中只保留最新帧"""
+        with self.screen_source() as screen:
+            while self.running:
+                try:
+                    start_time = time.perf_counter()
+                    captured = self.grab_frames(screen)
+                    if captured is None:
+                        time.sleep(0.05)
+                        continue
+                    frame_queue.put(captured)
                     
-                    if conf < self.confidence_threshold:
+                    # 全速模式没有帧预算，按推理的消费速度采集：上一帧被取走后再截下一帧，
+                    # 避免空转截图与推理争抢CPU和GIL
+                    if self.frame_pacer.frame_interval <= 0:
+                        while self.running and not frame_queue.wait_empty(timeout=0.1):
+                            pass
                         continue
                         
-                    cls = box.cls[0]
-                    original_label = result.names[int(cls)]
-                    display_label = self.custom_labels.get(original_label, original_label)
+                    # 按帧预算采集，只睡眠剩余的时间
+                    remaining = self.frame_pacer.frame_interval - (time.perf_counter() - start_time)
+                    if remaining > 0:
+                        time.sleep(remaining)
                     
-                    # 绘制边界框
-                    cv2.rectangle(frame, 
-                                (int(x1), int(y1)), 
-                                (int(x2), int(y2)), 
-                                (0, 255, 0), 2)
-                    
-                    # 绘制标签背景
-                    label = f'{display_label} {conf:.2f}'
-                    (label_w, label_h), _ = cv2.getTextSize(label, 
-                                                          cv2.FONT_HERSHEY_SIMPLEX, 
-                                                          0.5, 2)
-                    cv2.rectangle(frame,
-                                (int(x1), int(y1)-20),
-                                (int(x1)+label_w, int(y1)),
-                                (0, 255, 0), -1)
-                    
-                    # 绘制标签文本
-                    cv2.putText(frame, label, 
-                              (int(x1), int(y1)-5),
-                              cv2.FONT_HERSHEY_SIMPLEX, 
-                              0.5, (0, 0, 0), 2)
+                except Exception as e:
+                    self.log_message.emit(f"截图错误: {str(e)}")
+                    time.sleep(0.05)
                     
-                    detected_labels.append(display_label)
+    def _render_loop(self, render_queue):
+        """绘制线程：绘制检测框、发送结果并统计FPS"""
+        frame_count = 0
+        fps_start_time = time.time()
+        fps_update_interval = 1.0  # 每秒更新一次FPS
+        
+        while self.running:
+            item = render_queue.get(timeout=0.1)
+            if item is None:
+                continue
+                
+            try:
+                layout, batch, results = item
+                
+                # 界面还没绘制完上一帧时不绘制也不发送，避免信号队列堆积大量帧
+                if self._frame_in_flight.is_set():
+                    self.skipped_emits += 1
+                else:
+                    if self.tracking:
+                        self.track_summary_update.emit(self.summarize_tracks(results))
+                    draw_start = time.perf_counter()
+                    rendered = self.render(layout, batch, results)
+                    self.stage_timings.record('draw', time.perf_counter() - draw_start)
+                    self.emit_frame(*rendered)
+                
+                # 计算和更新FPS
+                frame_count += 1
+                if time.time() - fps_start_time >= fps_update_interval:
+                    fps = frame_count / (time.time() - fps_start_time)
+                    self.fps_update.emit(fps)
+                    self.dropped_update.emit(self.dropped_frames)
+                    self.report_metrics(fps)
+                    frame_count = 0
+                    fps_start_time = time.time()
                     
-            return frame, detected_labels
-            
-        except Exception as e:
-            self.log_message.emit(f"检测错误: {str(e)}")
-            return frame, []
+            except Exception as e:
+                self.log_message.emit(f"绘制错误: {str(e)}")
         
     def run(self):
         self.running = True
         self.log_message.emit(f"检测线程已启动 (模式: {self.detect_mode})")
         self.log_message.emit(f"当前置信度阈值: {self.confidence_threshold:.2f}")
+        self.skipped_emits = 0
+        self._frame_in_flight.clear()
+        self.stage_timings.reset()
+        self._reported_dropped = 0
+        self.reset_changes()
+        if self.detect_mode == 'video':
+            self._run_video()
+            return
+            
+        self.log_message.emit(f"当前帧率模式: {self.frame_pacer.describe()}")
+        
+        # 采集 -> 推理 -> 绘制 三级流水线，队列满时丢弃旧帧
+        # 跟踪模式下检测在单独的线程中进行，推理循环每帧只外推轨迹
+        frame_queue = LatestFrameQueue(maxsize=1)
+        render_queue = LatestFrameQueue(maxsize=2)
+        detect_queue = LatestFrameQueue(maxsize=1)
+        detected_queue = LatestFrameQueue(maxsize=2)
+        self.frame_queue = frame_queue
+        self.render_queue = render_queue
+        self._detect_busy.clear()
+        workers = [
+            threading.Thread(target=self._capture_loop, args=(frame_queue,), daemon=True),
+            threading.Thread(target=self._render_loop, args=(render_queue,), daemon=True),
+            threading.Thread(target=self._detect_loop, args=(detect_queue, detected_queue),
+                             daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+            
+        pacing_start_time = time.time()
+        saved_work = 0.0
+        inferred_steps = 0
+        while self.running:
+            captured = frame_queue.get(timeout=0.1)
+            if captured is None:
+                continue
+                
+            try:
+                # 多个区域合并为一次批量推理，画面未变化的区域复用上次结果
+                layout, batch = captured
+                if self.tracking:
+                    results, saved = self.track(batch, detect_queue, detected_queue)
+                    render_queue.put((layout, batch, results))
+                else:
+                    # 刚关闭跟踪时后台检测可能仍在推理，等它结束，避免两个线程同时调用模型和变化检测
+                    while self._detect_busy.is_set() and self.running:
+                        time.sleep(0.001)
+                    infer_start = time.perf_counter()
+                    results, saved = self.infer_changed(batch)
+                    render_queue.put((layout, batch, results))
+                    # 跳过推理的帧耗时不代表模型速度，只用完整推理的帧调节尺寸
+                    if self.imgsz_tuner is not None and not saved:
+                        self.tune_imgsz(time.perf_counter() - infer_start)
+                saved_work += saved
+                inferred_steps += 1
+            except Exception as e:
+                self.log_message.emit(f"运行时错误: {str(e)}")
+                
+            # 只睡眠本帧预算剩余的时间，并每秒报告一次超预算帧数
+            self.frame_pacer.wait()
+            if time.time() - pacing_start_time >= 1.0:
+                self.pacing_update.emit(self.frame_pacer.take_overruns())
+                self.skip_update.emit(saved_work / inferred_steps if inferred_steps else 0.0)
+                saved_work = 0.0
+                inferred_steps = 0
+                pacing_start_time = time.time()
+                
+        for worker in workers:
+            worker.join()
+        self.frame_buffers.clear()
         
+    def record_inference(self, results):
+        """把实际推理的结果计入运行指标，复用上次结果和跟踪外推的帧不计入"""
+        if self.metrics is not None:
+            self.metrics.record_results(results, self.confidence_threshold)
+            
+    def report_metrics(self, fps):
+        """每秒更新一次运行指标的帧率和丢帧数"""
+        if self.metrics is None:
+            return
+        dropped = self.dropped_frames
+        self.metrics.add_dropped(dropped - self._reported_dropped)
+        self._reported_dropped = dropped
+        self.metrics.set_fps(fps)
+        
+    def tune_imgsz(self, infer_time):
+        """按本帧推理耗时调整推理尺寸"""
+        # 切片推理时尺寸越小切片越多，总耗时基本不变，不参与自动调整
+        if self.tiling:
+            return
+        imgsz = self.imgsz_tuner.update(infer_time)
+        if imgsz is not None and imgsz != self.imgsz:
+            self.log_message.emit(f"推理耗时变化，推理尺寸自动调整为: {imgsz}")
+            self.imgsz = imgsz
+            
+    def _run_video(self):
+        """视频检测：解码线程提前解码，连续帧批量推理，写出标注视频和检测日志"""
+        self.frame_queue = None
+        self.render_queue = None
+        is_stream = is_stream_source(self.video_source)
+        reader = VideoReader(self.video_source, self.frame_skip,
+                             queue_size=self.video_batch_size * 2)
+        if not reader.is_opened():
+            self.log_message.emit(f"无法打开视频: {self.video_source}")
+            self.running = False
+            return
+            
+        if is_stream:
+            name = time.strftime("stream_%Y%m%d_%H%M%S")
+            output_fps = reader.fps
+        else:
+            name = os.path.splitext(os.path.basename(self.video_source))[0]
+            output_fps = reader.fps / self.frame_skip
+        recorder = VideoRecorder(self.video_output_dir, name, output_fps)
+        self.log_message.emit(f"视频帧率: {reader.fps:.1f} FPS，检测间隔: {self.frame_skip} 帧，"
+                              f"批大小: {self.video_batch_size}")
+        
+        reader.start()
+        start_time = time.time()
+        processed = 0
         frame_count = 0
         fps_start_time = time.time()
-        fps_update_interval = 1.0  # 每秒更新一次FPS
+        finished = False
         
-        with mss.mss() as screen:
-            while self.running:
-                try:
-                    # 获取截图
-                    if self.detect_mode == 'fullscreen':
-                        if len(screen.monitors) > 0:
-                            screenshot = screen.grab(screen.monitors[0])
-                        else:
-                            continue
-                    elif self.detect_mode == 'window' and self.selected_window:
-                        window_rect = get_window_rect(self.selected_window)
-                        if window_rect:
-                            screenshot = screen.grab(window_rect)
-                        else:
-                            self.log_message.emit("警告: 无法获取窗口区域，请确保窗口未被最小化")
-                            continue
-                    else:
-                        continue
-                        
-                    # 转换图像格式
-                    frame = np.array(screenshot)
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-                    
-                    # 处理帧
-                    frame, detected_labels = self.process_frame(frame)
-                    
-                    # 发送处理结果
-                    self.detection_complete.emit(frame, detected_labels)
+        while self.running and not finished:
+            # 从解码队列中取出连续的若干帧组成一批
+            items = []
+            item = reader.queue.get(timeout=0.1)
+            while item is not None:
+                if item is END_OF_STREAM:
+                    finished = True
+                    break
+                items.append(item)
+                if len(items) >= self.video_batch_size:
+                    break
+                item = reader.queue.get(timeout=0)
+            if not items:
+                continue
+                
+            try:
+                results = self.infer([frame for _, frame in items])
+                self.record_inference(results)
+                for (index, frame), result in zip(items, results):
+                    boxes, confs, class_ids, labels = self.postprocess(result)
+                    draw_detections(frame, boxes, confs, labels)
+                    recorder.write(index, index / reader.fps, frame,
+                                   to_records(boxes, confs, class_ids, labels))
                     
-                    # 计算和更新FPS
-                    frame_count += 1
-                    if time.time() - fps_start_time >= fps_update_interval:
-                        fps = frame_count / (time.time() - fps_start_time)
-                        self.fps_update.emit(fps)
-                        frame_count = 0
-                        fps_start_time = time.time()
-                    
-                    # 限制检测频率
-                    self.msleep(20)  # 约50FPS
-                    
-                except Exception as e:
-                    self.log_message.emit(f"运行时错误: {str(e)}")
-                    continue 
\ No newline at end of file
+                # 预览只发送这一批的最后一帧
+                if not self._frame_in_flight.is_set():
+                    h, w = frame.shape[:2]
+                    scale = fit_scale(w, h, *self.preview_size)
+                    preview = cv2.resize(frame, (max(1, int(w * scale)), max(1, int(h * scale))),
+                                         interpolation=cv2.INTER_AREA)
+                    self.emit_frame(preview, labels)
+            except Exception as e:
+                self.log_message.emit(f"运行时错误: {str(e)}")
+                
+            processed += len(items)
+            frame_count += len(items)
+            if time.time() - fps_start_time >= 1.0:
+                fps = frame_count / (time.time() - fps_start_time)
+                self.fps_update.emit(fps)
+                self.dropped_update.emit(self.dropped_frames)
+                self.report_metrics(fps)
+                frame_count = 0
+                fps_start_time = time.time()
+                
+        reader.stop()
+        recorder.close()
+        
+        elapsed = max(time.time() - start_time, 1e-6)
+        self.log_message.emit(f"视频检测结束: 检测 {processed} 帧，耗时 {elapsed:.1f}s，"
+                              f"{processed / elapsed:.1f} FPS")
+        if not is_stream:
+            self.log_message.emit(f"处理速度为实时的 {reader.frames_read / reader.fps / elapsed:.2f} 倍")
+        self.log_message.emit(f"标注视频已保存到: {recorder.video_path}")
+        self.log_message.emit(f"检测日志已保存到: {recorder.log_path}")
+        self.running = False
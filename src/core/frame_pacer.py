@@ -0,0 +1,72 @@
+import time
+
+class FramePacer:
+    """帧率控制器：每帧只睡眠预算剩余的时间，并统计超出预算的帧数"""
+
+    MODES = {
+        'target': '目标帧率',
+        'max': '全速',
+        'power_saver': '省电',
+    }
+    POWER_SAVER_FPS = 5
+
+    def __init__(self, mode='target', target_fps=30):
+        self.mode = 'target'
+        self.target_fps = 30.0
+        self.overruns = 0
+        self._deadline = None
+        self.set_mode(mode, target_fps)
+
+    def set_mode(self, mode, target_fps=None):
+        """设置帧率模式，target模式下可同时指定目标帧率"""
+        if mode not in self.MODES:
+            raise ValueError(f"未知的帧率模式: {mode}")
+        self.mode = mode
+        if target_fps:
+            self.target_fps = max(1.0, float(target_fps))
+        self._deadline = None
+
+    @property
+    def frame_interval(self):
+        """当前模式下每帧的时间预算（秒），全速模式为0"""
+        if self.mode == 'max':
+            return 0.0
+        if self.mode == 'power_saver':
+            return 1.0 / self.POWER_SAVER_FPS
+        return 1.0 / self.target_fps
+
+    def describe(self):
+        """返回当前模式的描述文本"""
+        if self.mode == 'target':
+            return f"{self.MODES[self.mode]} {self.target_fps:.0f} FPS"
+        if self.mode == 'power_saver':
+            return f"{self.MODES[self.mode]} {self.POWER_SAVER_FPS} FPS"
+        return self.MODES[self.mode]
+
+    def wait(self):
+        """等待到下一帧的开始时刻，返回本帧是否超出预算"""
+        interval = self.frame_interval
+        now = time.perf_counter()
+        if interval <= 0:
+            self._deadline = None
+            return False
+        if self._deadline is None:
+            self._deadline = now + interval
+            return False
+
+        remaining = self._deadline - now
+        if remaining > 0:
+            time.sleep(remaining)
+            self._deadline += interval
+            return False
+
+        # 超出预算时不再睡眠，并从当前时刻重新计时，避免连续追帧
+        self.overruns += 1
+        self._deadline = now + interval
+        return True
+
+    def take_overruns(self):
+        """返回并清零累计的超预算帧数"""
+        overruns = self.overruns
+        self.overruns = 0
+        return overruns
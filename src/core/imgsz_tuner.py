@@ -0,0 +1,79 @@
+import time
+import numpy as np
+
+IMGSZ_OPTIONS = (320, 480, 640, 960, 1280)
+DEFAULT_IMGSZ = 640
+
+def benchmark_imgsz(model, sizes=IMGSZ_OPTIONS, frame_shape=(1080, 1920, 3), runs=3):
+    """在当前硬件上测量各输入尺寸的单帧推理耗时，返回 {尺寸: 秒}"""
+    frame = np.zeros(frame_shape, dtype=np.uint8)
+    timings = {}
+    for imgsz in sizes:
+        # 第一次推理包含初始化开销，不计入耗时
+        model(frame, imgsz=imgsz, verbose=False)
+        start = time.perf_counter()
+        for _ in range(runs):
+            model(frame, imgsz=imgsz, verbose=False)
+        timings[imgsz] = (time.perf_counter() - start) / runs
+    return timings
+
+
+class ImgszTuner:
+    """自动选择推理尺寸：选满足目标帧率的最大尺寸，运行中耗时漂移时逐级调整
+
+    用指数滑动平均平滑单帧耗时，超出预算时降一级；
+    按基准测试的耗时比例估算上一级尺寸也能满足预算时升一级，
+    每次调整后冷却一段帧数，避免来回切换
+    """
+
+    def __init__(self, target_fps=30, sizes=IMGSZ_OPTIONS, smoothing=0.1, cooldown=30):
+        self.sizes = tuple(sorted(sizes))
+        self.smoothing = smoothing
+        self.cooldown = cooldown
+        self.timings = {}
+        self.imgsz = DEFAULT_IMGSZ
+        self._average = None
+        self._frames_since_change = 0
+        self.set_target_fps(target_fps)
+
+    def set_target_fps(self, target_fps):
+        self.budget = 1.0 / max(1.0, float(target_fps))
+
+    def calibrate(self, timings):
+        """根据基准测试结果选择初始尺寸，返回选中的尺寸"""
+        self.timings = dict(timings)
+        fitting = [size for size in self.sizes if timings.get(size, float('inf')) <= self.budget]
+        self.imgsz = fitting[-1] if fitting else self.sizes[0]
+        self._average = None
+        self._frames_since_change = 0
+        return self.imgsz
+
+    def update(self, infer_time):
+        """记录一帧的推理耗时，需要调整尺寸时返回新尺寸，否则返回None"""
+        if self._average is None:
+            self._average = infer_time
+        else:
+            self._average += self.smoothing * (infer_time - self._average)
+        self._frames_since_change += 1
+        if self._frames_since_change < self.cooldown:
+            return None
+
+        index = self.sizes.index(self.imgsz)
+        if self._average > self.budget * 1.1 and index > 0:
+            return self._change(self.sizes[index - 1])
+        if index + 1 < len(self.sizes):
+            larger = self.sizes[index + 1]
+            # 用基准测试的耗时比例估算升一级后的耗时，留出余量
+            ratio = self.timings.get(larger, 0) / max(self.timings.get(self.imgsz, 0), 1e-6)
+            if ratio and self._average * ratio < self.budget * 0.8:
+                return self._change(larger)
+        return None
+
+    def _change(self, imgsz):
+        # 新尺寸的耗时按基准测试比例换算，作为滑动平均的起点
+        ratio = self.timings.get(imgsz, 0) / max(self.timings.get(self.imgsz, 0), 1e-6)
+        if ratio:
+            self._average *= ratio
+        self.imgsz = imgsz
+        self._frames_since_change = 0
+        return imgsz
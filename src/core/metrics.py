@@ -0,0 +1,190 @@
+import os
+import sys
+import time
+import threading
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .stage_timer import StageTimings, LATENCY_BUCKETS
+from .postprocess import extract_detections
+
+DEFAULT_METRICS_HOST = '127.0.0.1'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def process_rss_bytes():
+    """返回进程当前的常驻内存（字节），无法获取时返回None"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage',
+                    'QuotaPagedPoolUsage', 'QuotaPeakNonPagedPoolUsage',
+                    'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+    return None
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class DetectionMetrics:
+    """检测运行指标，按 Prometheus 文本格式导出
+
+    计数器在整个进程生命周期内单调递增，重新加载模型、重新开始检测都不清零；
+    各阶段耗时直方图来自 StageTimings 的累计计数
+    """
+
+    def __init__(self):
+        self.stage_timings = StageTimings()
+        self.start_time = time.time()
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.detections = {}  # 类别名 -> 累计检测数
+        self.fps = None  # 只有显示循环会设置，服务模式下不导出
+        self.model_load_seconds = None
+        self.model_info = {}
+        self._lock = threading.Lock()
+
+    def record_results(self, results, threshold):
+        """记录一批实际推理的结果：推理的帧数和各类别置信度不低于阈值的检测数"""
+        counts = []
+        for result in results:
+            _, confs, class_ids = extract_detections(result)
+            class_ids = class_ids[confs >= threshold]
+            if len(class_ids):
+                ids, numbers = np.unique(class_ids, return_counts=True)
+                counts.extend((result.names.get(int(i), str(i)), int(n))
+                              for i, n in zip(ids, numbers))
+        with self._lock:
+            self.frames_processed += len(results)
+            for name, number in counts:
+                self.detections[name] = self.detections.get(name, 0) + number
+
+    def add_dropped(self, count):
+        if count > 0:
+            with self._lock:
+                self.frames_dropped += count
+
+    def set_fps(self, fps):
+        self.fps = fps
+
+    def set_model(self, load_seconds, model_path, backend, precision):
+        with self._lock:
+            self.model_load_seconds = load_seconds
+            self.model_info = {"model": os.path.basename(model_path), "backend": backend,
+                               "precision": precision}
+
+    def render(self):
+        """返回 Prometheus 文本格式的全部指标"""
+        with self._lock:
+            frames_processed = self.frames_processed
+            frames_dropped = self.frames_dropped
+            detections = dict(self.detections)
+            model_load_seconds = self.model_load_seconds
+            model_info = dict(self.model_info)
+
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{labels} {value}")
+
+        metric('yolo_frames_processed_total', 'counter',
+               "已推理的帧数（复用上次结果和跟踪外推的帧不计入，只推理变化区域的帧计入）",
+               [('', '', frames_processed)])
+        metric('yolo_frames_dropped_total', 'counter', "丢弃的帧数（队列挤掉和界面繁忙时跳过）",
+               [('', '', frames_dropped)])
+        fps = self.fps
+        if fps is not None:
+            metric('yolo_fps', 'gauge', "最近一秒显示的帧率", [('', '', f"{fps:.3f}")])
+        metric('yolo_detections_total', 'counter',
+               "各类别的累计检测数（每次推理各计一次，复用结果和跟踪外推的帧不计入）",
+               [('', _labels(**{'class': name}), count) for name, count in sorted(detections.items())])
+
+        samples = []
+        for stage, ring in self.stage_timings.rings.items():
+            if not ring.total_count:
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), ring.buckets):
+                cumulative += count
+                samples.append(('_bucket', _labels(stage=stage, le=bound), cumulative))
+            samples.append(('_sum', _labels(stage=stage), f"{ring.total_seconds:.6f}"))
+            samples.append(('_count', _labels(stage=stage), ring.total_count))
+        metric('yolo_stage_latency_seconds', 'histogram', "检测流水线各阶段耗时", samples)
+
+        if model_load_seconds is not None:
+            metric('yolo_model_load_seconds', 'gauge', "最近一次加载模型的耗时（含预热）",
+                   [('', _labels(**model_info), f"{model_load_seconds:.3f}")])
+        rss = process_rss_bytes()
+        if rss is not None:
+            metric('process_resident_memory_bytes', 'gauge', "进程常驻内存", [('', '', rss)])
+        metric('process_start_time_seconds', 'gauge', "进程启动时间（Unix时间戳）",
+               [('', '', f"{self.start_time:.3f}")])
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """在本机端口提供 /metrics 的HTTP服务，供 Prometheus 或 curl 抓取"""
+
+    def __init__(self, metrics, port, host=DEFAULT_METRICS_HOST):
+        self.metrics = metrics
+        self.port = port
+        self.host = host
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # 不在终端输出每次抓取的访问日志
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/metrics"
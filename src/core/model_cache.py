@@ -0,0 +1,145 @@
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'yolo_detect_gui')
+MAX_CACHE_SIZE_MB = 2048
+TEMP_PREFIX = '.tmp-'
+STALE_TEMP_SECONDS = 24 * 3600
+
+_hash_memo = {}
+
+def file_sha256(path, chunk_size=1 << 20):
+    """计算文件的 SHA256，文件未修改时直接返回上次的结果"""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key in _hash_memo:
+        return _hash_memo[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    _hash_memo[memo_key] = digest.hexdigest()
+    return _hash_memo[memo_key]
+
+def path_size(path):
+    """返回文件或目录的总字节数"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def remove_path(path):
+    """删除文件或目录，忽略不存在等错误"""
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+    except OSError:
+        pass
+
+
+class ModelCache:
+    """导出模型的磁盘缓存
+
+    缓存键由权重文件 SHA256、输入尺寸、后端和精度组成；
+    写入时先在临时目录生成再原子重命名，多个程序同时写入不会损坏缓存；
+    超过容量上限时按最近使用时间淘汰
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_size_mb=MAX_CACHE_SIZE_MB):
+        self.cache_dir = cache_dir
+        self.max_size = max_size_mb * 1024 * 1024
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, model_path, imgsz, backend, precision):
+        """生成缓存键"""
+        return f"{file_sha256(model_path)[:16]}_{backend}_{imgsz}_{precision}"
+
+    def entry_path(self, key, suffix=''):
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def get(self, key, suffix=''):
+        """返回缓存条目路径并更新使用时间，不存在时返回None"""
+        path = self.entry_path(key, suffix)
+        if not os.path.exists(path):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def temp_dir(self):
+        """在缓存目录下创建私有临时目录，用于生成新条目"""
+        return tempfile.mkdtemp(prefix=TEMP_PREFIX, dir=self.cache_dir)
+
+    def put(self, key, source, suffix=''):
+        """把已生成的文件或目录原子地放入缓存，返回条目路径
+
+        source 必须位于缓存目录内（例如 temp_dir() 中），以保证重命名是原子操作；
+        其他程序已写入相同条目时保留已有条目
+        """
+        path = self.entry_path(key, suffix)
+        try:
+            if os.path.isdir(source):
+                # 目录不能用 os.replace 覆盖非空目录，已存在说明其他程序先完成了
+                os.rename(source, path)
+            else:
+                os.replace(source, path)
+        except OSError:
+            if not os.path.exists(path):
+                raise
+            remove_path(source)
+        self.evict(keep=path)
+        return path
+
+    def entries(self):
+        """返回缓存条目列表 [(路径, 使用时间, 大小)]，不含临时目录"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(TEMP_PREFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                entries.append((path, os.path.getmtime(path), path_size(path)))
+            except OSError:
+                pass
+        return entries
+
+    def remove_stale_temps(self):
+        """清理异常退出时遗留的临时目录"""
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if name.startswith(TEMP_PREFIX) and now - os.path.getmtime(path) > STALE_TEMP_SECONDS:
+                    remove_path(path)
+            except OSError:
+                pass
+
+    def evict(self, keep=None):
+        """按最近使用时间淘汰条目，直到总大小不超过上限，返回删除的条目数"""
+        self.remove_stale_temps()
+        entries = sorted(self.entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        removed = 0
+        for path, _, size in entries:
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            remove_path(path)
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,261 @@
+import os
+import json
+import shutil
+from collections import OrderedDict
+import numpy as np
+from .model_cache import ModelCache
+from .quantize import (PRECISIONS, load_calibration_images, quantize_onnx,
+                       quantize_openvino, compare_models, format_report)
+
+BACKENDS = {
+    'pytorch': 'PyTorch',
+    'onnx': 'ONNX Runtime',
+    'openvino': 'OpenVINO',
+}
+
+EXPORT_SUFFIX = {'onnx': '.onnx', 'openvino': '_openvino_model'}
+
+# 已加载模型的内存缓存，切换回最近用过的模型时无需重新加载
+MAX_LOADED_MODELS = 5
+_loaded_models = OrderedDict()
+
+def is_backend_available(backend):
+    """检查推理后端依赖的运行库是否已安装"""
+    module = {'onnx': 'onnxruntime', 'openvino': 'openvino'}.get(backend)
+    if module is None:
+        return True
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+def default_backend(is_cuda_available):
+    """有GPU时使用PyTorch，否则优先使用ONNX Runtime"""
+    if not is_cuda_available and is_backend_available('onnx'):
+        return 'onnx'
+    return 'pytorch'
+
+def resolve_weights(model_path):
+    """返回权重文件的本地路径，官方权重不存在时先由ultralytics下载"""
+    if os.path.exists(model_path):
+        return model_path
+    from ultralytics import YOLO
+    return YOLO(model_path).ckpt_path
+
+def export_model(model_path, backend, cache, imgsz=640, precision='fp32', log=print):
+    """将 .pt 权重导出为指定后端格式并放入缓存，已缓存时直接返回缓存路径"""
+    from ultralytics import YOLO
+
+    model_path = resolve_weights(model_path)
+    key = cache.make_key(model_path, imgsz, backend, precision)
+    suffix = EXPORT_SUFFIX[backend]
+    cached = cache.get(key, suffix)
+    if cached:
+        log(f"使用已缓存的{BACKENDS[backend]}模型: {cached}")
+        return cached
+
+    log(f"首次使用{BACKENDS[backend]}，正在导出模型，请稍候...")
+    # 在缓存目录内的私有临时目录中导出，避免与其他程序同时导出时互相覆盖
+    work_dir = cache.temp_dir()
+    try:
+        weight = shutil.copy(model_path, work_dir)
+        # 导出动态输入尺寸的模型，推理时可以随时切换推理尺寸
+        exported = YOLO(weight).export(format=backend, imgsz=imgsz, device='cpu',
+                                       dynamic=True, half=precision == 'fp16')
+        cached = cache.put(key, str(exported), suffix)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    log(f"模型已导出并缓存: {cached}")
+    return cached
+
+def log_cached_report(cache, key, precision, log=print):
+    """输出缓存的与FP32的比较结果，没有缓存时返回False"""
+    report_path = cache.get(key, '_report.json')
+    if not report_path:
+        return False
+    with open(report_path, 'r', encoding='utf-8') as f:
+        for line in format_report(json.load(f), precision):
+            log(line)
+    return True
+
+def cache_report(cache, key, report):
+    """把与FP32的比较结果缓存在模型旁边"""
+    work_dir = cache.temp_dir()
+    try:
+        report_path = os.path.join(work_dir, 'report.json')
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f)
+        cache.put(key, report_path, '_report.json')
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def compare_fp16(model_path, backend, cache, fp16_weight, imgsz=640,
+                 calibration_dir='示例', log=print):
+    """首次使用FP16模型时与FP32导出模型比较速度和检测结果，结果缓存后之后加载时直接输出"""
+    from ultralytics import YOLO
+
+    key = cache.make_key(resolve_weights(model_path), imgsz, backend, 'fp16')
+    if log_cached_report(cache, key, 'fp16', log):
+        return
+    images = load_calibration_images(calibration_dir)
+    if not images:
+        log(f"校准目录中没有图片，跳过FP16与FP32的比较: {calibration_dir}")
+        return
+    fp32_weight = export_model(model_path, backend, cache, imgsz, 'fp32', log)
+    log(f"正在用 {len(images)} 张校准图片比较FP16与FP32模型...")
+    report = compare_models(YOLO(fp32_weight, task='detect'), YOLO(fp16_weight, task='detect'),
+                            images, imgsz)
+    cache_report(cache, key, report)
+    for line in format_report(report, 'fp16'):
+        log(line)
+
+def quantize_model(model_path, backend, cache, fp32_weight, imgsz=640,
+                   calibration_dir='示例', log=print):
+    """用校准图片把FP32导出模型量化为INT8并放入缓存，返回缓存路径
+
+    首次量化时与FP32模型比较速度和检测结果，比较结果一并缓存，之后加载时再次输出
+    """
+    from ultralytics import YOLO
+
+    key = cache.make_key(resolve_weights(model_path), imgsz, backend, 'int8')
+    suffix = EXPORT_SUFFIX[backend]
+    cached = cache.get(key, suffix)
+    if cached:
+        log(f"使用已缓存的INT8模型: {cached}")
+        log_cached_report(cache, key, 'int8', log)
+        return cached
+
+    images = load_calibration_images(calibration_dir)
+    if not images:
+        raise RuntimeError(f"校准目录中没有图片: {calibration_dir}")
+    log(f"正在使用 {len(images)} 张校准图片量化为INT8，请稍候...")
+
+    work_dir = cache.temp_dir()
+    try:
+        target = os.path.join(work_dir, 'model' + suffix)
+        if backend == 'onnx':
+            quantize_onnx(fp32_weight, target, images, imgsz)
+        else:
+            quantize_openvino(fp32_weight, target, images, imgsz)
+        report = compare_models(YOLO(fp32_weight, task='detect'), YOLO(target, task='detect'),
+                                images, imgsz)
+        cached = cache.put(key, target, suffix)
+        cache_report(cache, key, report)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    log(f"INT8模型已缓存: {cached}")
+    for line in format_report(report, 'int8'):
+        log(line)
+    return cached
+
+def _set_onnx_threads(model, weight, num_threads):
+    """用指定线程数重新创建ONNX Runtime会话"""
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = num_threads
+    # 新版ultralytics的会话在 AutoBackend.backend 上，旧版直接在 AutoBackend 上
+    autobackend = model.predictor.model
+    for holder in (getattr(autobackend, 'backend', None), autobackend):
+        if holder is not None and hasattr(holder, 'session'):
+            holder.session = onnxruntime.InferenceSession(
+                weight, options, providers=['CPUExecutionProvider'])
+            return True
+    return False
+
+def _set_openvino_threads(model, weight, num_threads):
+    """用指定线程数重新编译OpenVINO模型"""
+    import openvino as ov
+    from functools import partial
+
+    core = ov.Core()
+    xml = next(f for f in os.listdir(weight) if f.endswith('.xml'))
+    config = {"PERFORMANCE_HINT": "LATENCY", "INFERENCE_NUM_THREADS": num_threads}
+    autobackend = model.predictor.model
+    for holder in (getattr(autobackend, 'backend', None), autobackend):
+        if holder is not None and hasattr(holder, 'ov_compiled_model'):
+            if hasattr(holder, 'compile_model'):
+                holder.compile_model = partial(core.compile_model, device_name='CPU', config=config)
+            holder.ov_compiled_model = core.compile_model(
+                core.read_model(os.path.join(weight, xml)), 'CPU', config)
+            return True
+    return False
+
+def _set_torch_threads(num_threads):
+    """设置PyTorch的CPU推理线程数"""
+    if num_threads > 0:
+        import torch
+        torch.set_num_threads(num_threads)
+
+def load_model(model_path, backend='pytorch', num_threads=0, log=print,
+               imgsz=640, precision='fp32', cache=None, calibration_dir='示例'):
+    """按指定后端和精度加载模型，返回 (model, 实际使用的后端, 实际使用的精度)
+
+    非PyTorch后端会先导出并缓存模型，失败时退回PyTorch；
+    precision 为 fp32/fp16/int8，INT8 用 calibration_dir 中的图片校准，
+    不支持或失败时退回FP32；
+    num_threads 为CPU推理线程数，0 表示由运行库自动决定；
+    最近加载过的模型直接从内存中返回
+    """
+    mtime = os.path.getmtime(model_path) if os.path.exists(model_path) else None
+    memory_key = (os.path.abspath(model_path), mtime, backend, num_threads, imgsz, precision)
+    if memory_key in _loaded_models:
+        _loaded_models.move_to_end(memory_key)
+        model, actual_backend, actual_precision = _loaded_models[memory_key]
+        if actual_backend == 'pytorch':
+            _set_torch_threads(num_threads)
+        log("使用已加载的模型")
+        return model, actual_backend, actual_precision
+
+    result = _load_model(model_path, backend, num_threads, log, imgsz, precision, cache,
+                         calibration_dir)
+    _loaded_models[memory_key] = result
+    while len(_loaded_models) > MAX_LOADED_MODELS:
+        _loaded_models.popitem(last=False)
+    return result
+
+def _load_model(model_path, backend, num_threads, log, imgsz, precision, cache,
+                calibration_dir):
+    from ultralytics import YOLO
+
+    if backend != 'pytorch' and model_path.endswith('.pt'):
+        if not is_backend_available(backend):
+            log(f"未安装{BACKENDS[backend]}运行库，使用PyTorch")
+        else:
+            try:
+                cache = cache or ModelCache()
+                if precision == 'fp16' and backend == 'onnx':
+                    log("ONNX Runtime的CPU推理不支持FP16加速，使用FP32")
+                    precision = 'fp32'
+                weight = export_model(model_path, backend, cache, imgsz,
+                                      'fp16' if precision == 'fp16' else 'fp32', log)
+                if precision == 'int8':
+                    try:
+                        weight = quantize_model(model_path, backend, cache, weight, imgsz,
+                                                calibration_dir, log)
+                    except Exception as e:
+                        log(f"INT8量化失败，使用FP32: {str(e)}")
+                        precision = 'fp32'
+                elif precision == 'fp16':
+                    try:
+                        compare_fp16(model_path, backend, cache, weight, imgsz,
+                                     calibration_dir, log)
+                    except Exception as e:
+                        log(f"FP16与FP32比较失败: {str(e)}")
+                model = YOLO(weight, task='detect')
+                # 预热一次，建立推理会话
+                model(np.zeros((64, 64, 3), dtype=np.uint8), device='cpu', verbose=False)
+                if num_threads > 0:
+                    setter = _set_onnx_threads if backend == 'onnx' else _set_openvino_threads
+                    if not setter(model, weight, num_threads):
+                        log("当前ultralytics版本不支持设置推理线程数，使用默认线程数")
+                return model, backend, precision
+            except Exception as e:
+                log(f"{BACKENDS[backend]}模型加载失败，使用PyTorch: {str(e)}")
+
+    if precision != 'fp32':
+        log(f"PyTorch后端不支持{PRECISIONS[precision]}量化推理，使用FP32")
+    _set_torch_threads(num_threads)
+    return YOLO(model_path), 'pytorch', 'fp32'
@@ -0,0 +1,96 @@
+import sys
+import threading
+from collections import deque
+import numpy as np
+
+END_OF_STREAM = object()  # 视频读取结束的标记
+
+class LatestFrameQueue:
+    """有界帧队列，队列满时丢弃最旧的帧（最新帧优先）"""
+
+    def __init__(self, maxsize=1):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        """放入一项，队列已满时挤掉最旧的一项"""
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify_all()
+
+    def put_wait(self, item, timeout=None):
+        """等待队列有空位后放入一项（不丢帧），超时返回False"""
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self._cond.wait_for(lambda: len(self._items) < self._items.maxlen, timeout)
+            if len(self._items) == self._items.maxlen:
+                return False
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """取出最旧的一项，超时返回None"""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def wait_empty(self, timeout=None):
+        """等待队列中的项都被取走，超时返回False"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._items, timeout)
+
+    def clear(self):
+        """清空队列"""
+        with self._cond:
+            self._items.clear()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class FrameRingBuffer:
+    """按尺寸复用的帧缓冲池，避免每帧分配内存
+
+    借出的是缓冲数组本身；numpy 的切片和视图都以该数组为 base，会增加它的引用计数，
+    只有除缓冲池外没有任何引用（帧、切片、推理结果中的原图等都已释放）时才再次借出，
+    流水线任何一级仍持有的帧或其切片不会被后续采集覆盖；同一尺寸的缓冲都在使用中时临时分配新数组
+    """
+
+    def __init__(self, depth=16, dtype=np.uint8):
+        self.depth = depth  # 每种尺寸最多缓存的数组数
+        self.dtype = dtype
+        self.misses = 0  # 缓冲都在使用中而临时分配的次数
+        self._slots = {}  # 尺寸 -> [数组]
+        self._lock = threading.Lock()
+        # 只被缓冲池列表引用时 sys.getrefcount 的返回值，不同Python版本可能不同，按同样的写法实测
+        probe = [np.empty(1, dtype=dtype)]
+        self._free_refs = sys.getrefcount(probe[0])
+
+    def acquire(self, shape):
+        """借出一个指定尺寸的空闲缓冲，没有空闲且未达上限时分配新缓冲"""
+        shape = tuple(shape)
+        with self._lock:
+            slots = self._slots.setdefault(shape, [])
+            for index in range(len(slots)):
+                if sys.getrefcount(slots[index]) <= self._free_refs:
+                    return slots[index]
+            if len(slots) >= self.depth:
+                self.misses += 1
+                return np.empty(shape, dtype=self.dtype)
+            slots.append(np.empty(shape, dtype=self.dtype))
+            return slots[-1]
+
+    def clear(self):
+        """释放所有缓冲，仍在使用中的帧不受影响"""
+        with self._lock:
+            self._slots.clear()
@@ -0,0 +1,116 @@
+import cv2
+import numpy as np
+
+BOX_COLOR = (0, 255, 0)
+TEXT_COLOR = (0, 0, 0)
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+def empty_detections():
+    """返回空的检测结果 (boxes, confs, class_ids)"""
+    return (np.empty((0, 4), dtype=np.float32),
+            np.empty(0, dtype=np.float32),
+            np.empty(0, dtype=np.int64))
+
+class Detections:
+    """复用或合并得到的检测结果，可以像推理结果一样传给 extract_detections"""
+
+    def __init__(self, boxes, confs, class_ids, names, track_ids=None):
+        self.boxes = boxes
+        self.confs = confs
+        self.class_ids = class_ids
+        self.names = names
+        self.track_ids = track_ids  # 跟踪模式下各检测框的轨迹ID
+
+    def __len__(self):
+        return len(self.boxes)
+
+def extract_detections(result):
+    """一次性取出单个推理结果中的全部检测框，返回 (boxes, confs, class_ids)"""
+    if isinstance(result, Detections):
+        return result.boxes, result.confs, result.class_ids
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return empty_detections()
+
+    # boxes.data 为 N x 6 (xyxy, conf, cls)，跟踪模式下为 N x 7，只做一次设备到主机的拷贝
+    data = boxes.data.cpu().numpy()
+    return (data[:, :4].astype(np.float32),
+            data[:, -2].astype(np.float32),
+            data[:, -1].astype(np.int64))
+
+def box_iou(a, b):
+    """计算两组框 (N,4) 和 (M,4) 的IoU矩阵"""
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(rb - lt, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+def nms_detections(boxes, confs, class_ids, iou_threshold=0.5):
+    """按类别做非极大值抑制，返回保留的 (boxes, confs, class_ids)"""
+    if len(boxes) == 0:
+        return boxes, confs, class_ids
+    # 不同类别的框平移到互不重叠的位置，一次NMS即可按类别分别抑制
+    offset = class_ids.astype(np.float32)[:, None] * (float(boxes.max()) + 1)
+    shifted = boxes + offset
+    xywh = np.concatenate([shifted[:, :2], shifted[:, 2:] - shifted[:, :2]], axis=1)
+    keep = cv2.dnn.NMSBoxes(xywh.tolist(), confs.tolist(), 0.0, iou_threshold)
+    keep = np.asarray(keep, dtype=np.int64).reshape(-1)
+    return boxes[keep], confs[keep], class_ids[keep]
+
+def merge_detections(parts, names, iou_threshold=0.5):
+    """合并多组 (boxes, confs, class_ids) 并按类别去重，返回 Detections"""
+    parts = [part for part in parts if len(part[0])]
+    if not parts:
+        return Detections(*empty_detections(), names)
+    boxes = np.concatenate([part[0] for part in parts]).astype(np.float32)
+    confs = np.concatenate([part[1] for part in parts]).astype(np.float32)
+    class_ids = np.concatenate([part[2] for part in parts]).astype(np.int64)
+    return Detections(*nms_detections(boxes, confs, class_ids, iou_threshold), names)
+
+def build_label_lut(names, custom_labels):
+    """构建类别ID到显示名称的查找表"""
+    size = max(names) + 1 if names else 0
+    lut = np.empty(size, dtype=object)
+    for idx, name in names.items():
+        lut[idx] = custom_labels.get(name, name)
+    return lut
+
+def filter_detections(boxes, confs, class_ids, threshold):
+    """按置信度阈值批量过滤检测结果"""
+    keep = confs >= threshold
+    return boxes[keep], confs[keep], class_ids[keep]
+
+def to_records(boxes, confs, class_ids, labels):
+    """将检测结果转换为可序列化的字典列表"""
+    return [
+        {
+            "label": label,
+            "class_id": int(class_id),
+            "confidence": round(float(conf), 4),
+            "box": [round(float(v), 1) for v in box],
+        }
+        for box, conf, class_id, label in zip(boxes.tolist(), confs.tolist(),
+                                              class_ids.tolist(), labels)
+    ]
+
+def draw_detections(frame, boxes, confs, labels):
+    """在帧上绘制检测框和标签"""
+    if len(boxes) == 0:
+        return frame
+
+    coords = boxes.astype(np.int32)
+    for (x1, y1, x2, y2), conf, display_label in zip(coords.tolist(), confs.tolist(), labels):
+        # 绘制边界框
+        cv2.rectangle(frame, (x1, y1), (x2, y2), BOX_COLOR, 2)
+
+        # 绘制标签背景
+        label = f'{display_label} {conf:.2f}'
+        (label_w, label_h), _ = cv2.getTextSize(label, FONT, 0.5, 2)
+        cv2.rectangle(frame, (x1, y1 - 20), (x1 + label_w, y1), BOX_COLOR, -1)
+
+        # 绘制标签文本
+        cv2.putText(frame, label, (x1, y1 - 5), FONT, 0.5, TEXT_COLOR, 2)
+
+    return frame
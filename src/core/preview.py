@@ -0,0 +1,65 @@
+import math
+import cv2
+import numpy as np
+
+ROI_COLOR = (255, 128, 0)
+
+def fit_scale(width, height, max_width, max_height):
+    """返回把 width x height 缩放到不超过给定尺寸的比例（不放大）"""
+    if width <= 0 or height <= 0:
+        return 1.0
+    return min(1.0, max_width / width, max_height / height)
+
+def clip_region(region, bounds):
+    """将区域裁剪到边界区域内，完全不相交时返回None"""
+    left = max(region['left'], bounds['left'])
+    top = max(region['top'], bounds['top'])
+    right = min(region['left'] + region['width'], bounds['left'] + bounds['width'])
+    bottom = min(region['top'] + region['height'], bounds['top'] + bounds['height'])
+    if right <= left or bottom <= top:
+        return None
+    return {"left": left, "top": top, "width": right - left, "height": bottom - top}
+
+def compose_canvas(canvas_region, crops, max_size=(1920, 1080)):
+    """将各采集区域按屏幕位置贴到缩小后的画布上，返回 (canvas, scale)"""
+    scale = fit_scale(canvas_region['width'], canvas_region['height'], *max_size)
+    canvas_w = max(1, int(canvas_region['width'] * scale))
+    canvas_h = max(1, int(canvas_region['height'] * scale))
+    canvas = np.zeros((canvas_h, canvas_w, 3), dtype=np.uint8)
+
+    for frame, region in crops:
+        x1 = int((region['left'] - canvas_region['left']) * scale)
+        y1 = int((region['top'] - canvas_region['top']) * scale)
+        x2 = min(canvas_w, x1 + max(1, int(region['width'] * scale)))
+        y2 = min(canvas_h, y1 + max(1, int(region['height'] * scale)))
+        if x2 <= x1 or y2 <= y1:
+            continue
+        canvas[y1:y2, x1:x2] = cv2.resize(frame, (x2 - x1, y2 - y1),
+                                          interpolation=cv2.INTER_AREA)
+        cv2.rectangle(canvas, (x1, y1), (x2 - 1, y2 - 1), ROI_COLOR, 1)
+
+    return canvas, scale
+
+def compose_tiles(frames, max_size=(1920, 1080)):
+    """将多帧按网格平铺到一张预览画布上，返回 (canvas, placements)
+
+    placements 为每帧在画布上的 (x, y, scale)
+    """
+    cols = math.ceil(math.sqrt(len(frames)))
+    rows = math.ceil(len(frames) / cols)
+    cell_w = max_size[0] // cols
+    cell_h = max_size[1] // rows
+    canvas = np.zeros((cell_h * rows, cell_w * cols, 3), dtype=np.uint8)
+
+    placements = []
+    for idx, frame in enumerate(frames):
+        h, w = frame.shape[:2]
+        scale = min(cell_w / w, cell_h / h)
+        tile_w, tile_h = max(1, int(w * scale)), max(1, int(h * scale))
+        x = (idx % cols) * cell_w + (cell_w - tile_w) // 2
+        y = (idx // cols) * cell_h + (cell_h - tile_h) // 2
+        canvas[y:y + tile_h, x:x + tile_w] = cv2.resize(frame, (tile_w, tile_h),
+                                                        interpolation=cv2.INTER_AREA)
+        placements.append((x, y, scale))
+
+    return canvas, placements
@@ -0,0 +1,167 @@
+import os
+import re
+import time
+import shutil
+import cv2
+import numpy as np
+from .postprocess import extract_detections, box_iou
+from ..utils.image_utils import find_images, read_image
+
+PRECISIONS = {
+    'fp32': 'FP32',
+    'fp16': 'FP16',
+    'int8': 'INT8',
+}
+
+MAX_CALIBRATION_IMAGES = 32
+
+def letterbox(image, imgsz):
+    """按YOLO的方式等比缩放并填充到 imgsz x imgsz，返回 NCHW float32 输入"""
+    h, w = image.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = cv2.resize(image, (new_w, new_h),
+                                                           interpolation=cv2.INTER_LINEAR)
+    blob = cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)
+    return np.ascontiguousarray(blob[None], dtype=np.float32) / 255.0
+
+def load_calibration_images(folder, limit=MAX_CALIBRATION_IMAGES):
+    """读取校准图片，返回 BGR 图片列表"""
+    images = []
+    for path in find_images(folder)[:limit]:
+        image = read_image(path)
+        if image is not None:
+            images.append(image)
+    return images
+
+
+class CalibrationReader:
+    """ONNX Runtime 静态量化的校准数据读取器"""
+
+    def __init__(self, input_name, images, imgsz):
+        self.input_name = input_name
+        self.blobs = [letterbox(image, imgsz) for image in images]
+        self._index = 0
+
+    def get_next(self):
+        if self._index >= len(self.blobs):
+            return None
+        blob = self.blobs[self._index]
+        self._index += 1
+        return {self.input_name: blob}
+
+    def rewind(self):
+        self._index = 0
+
+
+def _detect_head_nodes(onnx_model):
+    """返回检测头中解码部分的节点名
+
+    检测头的卷积量化后速度收益大，保持量化；框解码（DFL、拼接、Sigmoid等）
+    对量化误差敏感，保持浮点计算
+    """
+    indices = [int(match.group(1)) for node in onnx_model.graph.node
+               for match in [re.match(r'/model\.(\d+)/', node.name)] if match]
+    if not indices:
+        return []
+    prefix = f'/model.{max(indices)}/'
+    return [node.name for node in onnx_model.graph.node
+            if node.name.startswith(prefix) and (node.op_type != 'Conv' or '/dfl/' in node.name)]
+
+def quantize_onnx(source, target, images, imgsz):
+    """用校准图片对ONNX模型做INT8静态量化（QDQ格式，逐通道权重）"""
+    import onnx
+    from onnxruntime.quantization import (quantize_static, QuantFormat, QuantType,
+                                          CalibrationMethod)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    # 量化前先做图优化和形状推断，卷积与偏置融合后量化效果更好
+    prepared = target + '.pre.onnx'
+    quant_pre_process(source, prepared, skip_symbolic_shape=True)
+    model = onnx.load(prepared)
+    reader = CalibrationReader(model.graph.input[0].name, images, imgsz)
+    quantize_static(prepared, target, reader,
+                    quant_format=QuantFormat.QDQ,
+                    per_channel=True,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8,
+                    calibrate_method=CalibrationMethod.MinMax,
+                    nodes_to_exclude=_detect_head_nodes(model))
+    os.remove(prepared)
+
+    # 保留ultralytics写入的模型信息（类别名、输入尺寸等）
+    quantized = onnx.load(target)
+    if not quantized.metadata_props:
+        for prop in model.metadata_props:
+            quantized.metadata_props.add(key=prop.key, value=prop.value)
+        onnx.save(quantized, target)
+
+def quantize_openvino(source_dir, target_dir, images, imgsz):
+    """用校准图片对OpenVINO模型做INT8训练后量化（需要安装nncf）"""
+    import nncf
+    import openvino as ov
+
+    xml = next(name for name in os.listdir(source_dir) if name.endswith('.xml'))
+    ov_model = ov.Core().read_model(os.path.join(source_dir, xml))
+    dataset = nncf.Dataset(images, lambda image: letterbox(image, imgsz))
+    quantized = nncf.quantize(ov_model, dataset,
+                              preset=nncf.QuantizationPreset.MIXED,
+                              subset_size=len(images))
+
+    os.makedirs(target_dir, exist_ok=True)
+    ov.save_model(quantized, os.path.join(target_dir, xml))
+    for name in os.listdir(source_dir):
+        if name.endswith('.yaml'):
+            shutil.copy(os.path.join(source_dir, name), target_dir)
+
+def compare_models(reference, candidate, images, imgsz, conf=0.25, iou=0.5):
+    """比较低精度（FP16/INT8）模型与FP32模型的速度和检测结果
+
+    以FP32的检测结果为基准，同类别且IoU不低于 iou 的框视为一致，
+    返回 {基准耗时ms, 量化耗时ms, 加速比, 一致率, 平均置信度变化}
+    """
+    timings = {}
+    outputs = {}
+    for name, model in (('reference', reference), ('candidate', candidate)):
+        model(images[0], imgsz=imgsz, verbose=False)  # 预热
+        start = time.perf_counter()
+        outputs[name] = [extract_detections(model(image, imgsz=imgsz, conf=conf, verbose=False)[0])
+                         for image in images]
+        timings[name] = (time.perf_counter() - start) / len(images) * 1000
+
+    total = matched = 0
+    conf_deltas = []
+    for (ref_boxes, ref_confs, ref_ids), (boxes, confs, ids) in zip(outputs['reference'],
+                                                                   outputs['candidate']):
+        total += len(ref_boxes)
+        if not len(ref_boxes) or not len(boxes):
+            continue
+        ious = box_iou(ref_boxes, boxes)
+        ious[ref_ids[:, None] != ids[None, :]] = 0
+        best = ious.argmax(axis=1)
+        hits = ious[np.arange(len(ref_boxes)), best] >= iou
+        matched += int(hits.sum())
+        conf_deltas.extend((confs[best[hits]] - ref_confs[hits]).tolist())
+
+    return {
+        "reference_ms": timings['reference'],
+        "candidate_ms": timings['candidate'],
+        "speedup": timings['reference'] / max(timings['candidate'], 1e-6),
+        "agreement": matched / total if total else None,
+        "conf_delta": float(np.mean(conf_deltas)) if conf_deltas else None,
+    }
+
+def format_report(report, precision):
+    """把比较结果格式化为日志文本"""
+    name = PRECISIONS[precision]
+    lines = [f"{name} 相比 FP32: 推理耗时 {report['reference_ms']:.1f}ms -> "
+             f"{report['candidate_ms']:.1f}ms ({report['speedup']:.2f}x)"]
+    if report['agreement'] is None:
+        lines.append("校准图片中FP32模型未检测到目标，无法比较精度")
+    else:
+        delta = report['conf_delta'] or 0.0
+        lines.append(f"检测结果与FP32一致率: {report['agreement'] * 100:.1f}%，"
+                     f"平均置信度变化: {delta:+.3f}")
+    return lines
@@ -0,0 +1,119 @@
+from bisect import bisect_left
+import numpy as np
+
+# 检测流水线的各阶段，按一帧经过的先后顺序排列
+STAGES = ('grab', 'convert', 'preprocess', 'inference', 'postprocess', 'draw', 'emit', 'paint')
+
+STAGE_NAMES = {
+    'grab': '截图',
+    'convert': '颜色转换',
+    'preprocess': '预处理',
+    'inference': '推理',
+    'postprocess': 'NMS后处理',
+    'draw': '绘制',
+    'emit': '信号传递',
+    'paint': '界面绘制',
+}
+
+# 用于判断瓶颈：采集慢看截图，模型慢看推理，界面慢看Qt
+STAGE_GROUPS = {
+    '采集': ('grab', 'convert'),
+    '模型': ('preprocess', 'inference', 'postprocess'),
+    '绘制': ('draw',),
+    '界面': ('emit', 'paint'),
+}
+
+PERCENTILES = (50, 95, 99)
+
+# 累计直方图的桶上界（秒），供指标接口导出
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+class LatencyRing:
+    """固定容量的耗时环形缓冲，只保留最近 capacity 个样本，记录一次只是一次数组写入
+
+    同时按 LATENCY_BUCKETS 累计直方图计数，累计值不随 reset 清零
+    """
+
+    def __init__(self, capacity=512):
+        self._samples = np.zeros(capacity, dtype=np.float64)
+        self._index = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # 最后一个桶为 +Inf
+        self.total_count = 0
+        self.total_seconds = 0.0
+
+    @property
+    def count(self):
+        """自上次 reset 以来记录的次数，不随 reset 清零的累计次数见 total_count"""
+        return self._index
+
+    def record(self, seconds):
+        self._samples[self._index % len(self._samples)] = seconds
+        self._index += 1
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total_count += 1
+        self.total_seconds += seconds
+
+    def values(self):
+        """返回最近的样本（秒）"""
+        return self._samples[:min(self._index, len(self._samples))].copy()
+
+    def reset(self):
+        """清空最近的样本，累计直方图保留"""
+        self._index = 0
+
+
+class StageTimings:
+    """记录检测流水线各阶段的耗时，按最近的样本计算滚动百分位数"""
+
+    def __init__(self, capacity=512):
+        self.rings = {stage: LatencyRing(capacity) for stage in STAGES}
+
+    def record(self, stage, seconds):
+        self.rings[stage].record(seconds)
+
+    def record_speed(self, results):
+        """记录 ultralytics 推理结果中的预处理、推理和后处理耗时（speed 为每张图的毫秒数）"""
+        speed = getattr(results[0], 'speed', None) if len(results) else None
+        if not speed:
+            return
+        for stage in ('preprocess', 'inference', 'postprocess'):
+            if speed.get(stage) is not None:
+                self.rings[stage].record(speed[stage] * len(results) / 1000)
+
+    def reset(self):
+        for ring in self.rings.values():
+            ring.reset()
+
+    def summary(self):
+        """返回有样本的阶段 {阶段: {count, p50, p95, p99, max}}，单位为毫秒"""
+        result = {}
+        for stage, ring in self.rings.items():
+            values = ring.values()
+            if not len(values):
+                continue
+            values *= 1000
+            stats = {"count": ring.count}
+            for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+                stats[f"p{p}"] = float(value)
+            stats["max"] = float(values.max())
+            result[stage] = stats
+        return result
+
+def find_bottleneck(summary):
+    """按各组阶段 p50 之和找出最慢的一组，返回 (组名, 毫秒)，没有样本时返回None"""
+    totals = {group: sum(summary[stage]['p50'] for stage in stages if stage in summary)
+              for group, stages in STAGE_GROUPS.items()}
+    totals = {group: total for group, total in totals.items() if total > 0}
+    if not totals:
+        return None
+    group = max(totals, key=totals.get)
+    return group, totals[group]
+
+def format_overlay(summary):
+    """预览画面上叠加显示的文本行：各阶段 p50/p95 和瓶颈"""
+    lines = [f"{STAGE_NAMES[stage]}: {stats['p50']:.1f} / {stats['p95']:.1f} ms"
+             for stage, stats in summary.items()]
+    bottleneck = find_bottleneck(summary)
+    if bottleneck is not None:
+        lines.append(f"瓶颈: {bottleneck[0]} ({bottleneck[1]:.1f} ms)")
+    return lines
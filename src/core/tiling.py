@@ -0,0 +1,64 @@
+DEFAULT_TILE_OVERLAP = 0.2
+MAX_TILE_SKIP = 8  # 空切片最多连续跳过的帧数
+
+def _tile_starts(length, tile_size, step):
+    if length <= tile_size:
+        return [0]
+    starts = list(range(0, length - tile_size, step))
+    starts.append(length - tile_size)  # 最后一块贴齐边缘，所有切片尺寸相同
+    return starts
+
+def make_tiles(width, height, tile_size, overlap=DEFAULT_TILE_OVERLAP):
+    """把画面划分为相互重叠的切片，返回 [(x1, y1, x2, y2)]，画面不大于切片时只有一块"""
+    step = max(1, int(tile_size * (1 - overlap)))
+    return [(x, y, min(width, x + tile_size), min(height, y + tile_size))
+            for y in _tile_starts(height, tile_size, step)
+            for x in _tile_starts(width, tile_size, step)]
+
+def tiles_containing(tiles, points):
+    """返回包含任一点 (x, y) 的切片序号"""
+    return [index for index, (x1, y1, x2, y2) in enumerate(tiles)
+            if any(x1 <= x < x2 and y1 <= y < y2 for x, y in points)]
+
+
+class TileScheduler:
+    """自适应跳过空切片
+
+    连续没有检测到目标的切片按指数退避跳过若干帧（最多 max_skip 帧），
+    切片或整帧推理在其中检测到目标后恢复每帧推理
+    """
+
+    def __init__(self, max_skip=MAX_TILE_SKIP):
+        self.max_skip = max_skip
+        self._state = {}  # 采集区域 -> 各切片的 [剩余跳过帧数, 退避帧数]
+
+    def reset(self):
+        self._state.clear()
+
+    def select(self, key, count):
+        """返回本帧需要推理的切片序号"""
+        state = self._state.get(key)
+        if state is None or len(state) != count:
+            state = [[0, 0] for _ in range(count)]
+            self._state[key] = state
+        selected = []
+        for index, entry in enumerate(state):
+            if entry[0] > 0:
+                entry[0] -= 1
+            else:
+                selected.append(index)
+        return selected
+
+    def report(self, key, index, found):
+        """记录切片的推理结果，没有检测到目标时加倍跳过的帧数"""
+        entry = self._state[key][index]
+        entry[1] = 0 if found else min(max(1, entry[1] * 2), self.max_skip)
+        entry[0] = entry[1]
+
+    def wake(self, key, indices):
+        """整帧推理在这些切片中发现了目标，下一帧恢复推理"""
+        state = self._state.get(key)
+        if state is None:
+            return
+        for index in indices:
+            state[index][0] = state[index][1] = 0
@@ -0,0 +1,165 @@
+import numpy as np
+from .postprocess import box_iou
+
+TRACK_LOW_THRESHOLD = 0.1  # 低于检测置信度阈值、不低于该值的检测框只用于延续已有轨迹
+DEFAULT_DETECT_INTERVAL = 3
+
+def xyxy_to_cxcywh(boxes):
+    return np.concatenate([(boxes[..., :2] + boxes[..., 2:]) / 2,
+                           boxes[..., 2:] - boxes[..., :2]], axis=-1)
+
+def cxcywh_to_xyxy(boxes):
+    half = np.maximum(boxes[..., 2:], 1.0) / 2
+    return np.concatenate([boxes[..., :2] - half, boxes[..., :2] + half], axis=-1)
+
+def greedy_match(iou, threshold):
+    """按IoU从大到小贪心匹配，返回 [(行, 列)]"""
+    matches = []
+    if iou.size == 0:
+        return matches
+    rows, cols = np.nonzero(iou >= threshold)
+    used_rows, used_cols = set(), set()
+    for index in np.argsort(-iou[rows, cols], kind='stable'):
+        row, col = int(rows[index]), int(cols[index])
+        if row not in used_rows and col not in used_cols:
+            used_rows.add(row)
+            used_cols.add(col)
+            matches.append((row, col))
+    return matches
+
+
+class KalmanBoxFilter:
+    """匀速模型的卡尔曼滤波，状态为框的 (cx, cy, w, h) 及其速度（像素/秒）
+
+    噪声按框的尺寸缩放，按实际时间间隔预测，检测间隔不固定时也能正确外推
+    """
+
+    POSITION_NOISE = 1 / 20  # 观测噪声：框尺寸的比例
+    VELOCITY_NOISE = 1 / 2  # 速度每秒的随机变化：框尺寸的比例
+
+    def __init__(self, box, timestamp):
+        measurement = xyxy_to_cxcywh(np.asarray(box, dtype=np.float64))
+        self.mean = np.concatenate([measurement, np.zeros(4)])
+        size = max(measurement[2], measurement[3], 1.0)
+        # 初始速度未知，速度方差取较大值
+        self.covariance = np.diag(np.square(np.r_[[size * self.POSITION_NOISE] * 4, [size] * 4]))
+        self.timestamp = timestamp
+
+    def predict(self, timestamp):
+        dt = max(0.0, timestamp - self.timestamp)
+        transition = np.eye(8)
+        transition[:4, 4:] = np.eye(4) * dt
+        size = max(self.mean[2], self.mean[3], 1.0)
+        noise = np.diag(np.r_[[(size * self.POSITION_NOISE) ** 2 * dt] * 4,
+                              [(size * self.VELOCITY_NOISE) ** 2 * dt] * 4])
+        self.mean = transition @ self.mean
+        self.covariance = transition @ self.covariance @ transition.T + noise
+        self.timestamp = timestamp
+
+    def update(self, box):
+        measurement = xyxy_to_cxcywh(np.asarray(box, dtype=np.float64))
+        size = max(measurement[2], measurement[3], 1.0)
+        noise = np.eye(4) * (size * self.POSITION_NOISE) ** 2
+        projected = self.covariance[:4, :4] + noise
+        gain = self.covariance[:, :4] @ np.linalg.inv(projected)
+        self.mean = self.mean + gain @ (measurement - self.mean[:4])
+        self.covariance = self.covariance - gain @ self.covariance[:4, :]
+
+    def box_at(self, timestamp):
+        """返回外推到指定时刻的框 (x1, y1, x2, y2)，不改变滤波状态"""
+        dt = max(0.0, timestamp - self.timestamp)
+        return cxcywh_to_xyxy(self.mean[:4] + self.mean[4:] * dt)
+
+
+class Track:
+    def __init__(self, track_id, box, conf, class_id, timestamp):
+        self.track_id = track_id
+        self.class_id = class_id
+        self.conf = conf
+        self.filter = KalmanBoxFilter(box, timestamp)
+        self.hits = 1
+        self.last_seen = timestamp
+
+
+class ObjectTracker:
+    """ByteTrack风格的多目标跟踪：高分检测框先与轨迹匹配，低分检测框只用于延续剩余轨迹
+
+    匹配按类别分开，用卡尔曼预测框与检测框的IoU贪心匹配；
+    两次检测之间按轨迹速度外推检测框
+    """
+
+    def __init__(self, ids, high_threshold=0.25, low_threshold=TRACK_LOW_THRESHOLD,
+                 match_iou=0.3, low_match_iou=0.5, min_hits=2, max_age=1.0):
+        self.ids = ids  # 轨迹ID生成器，多个跟踪器共享时ID全局唯一
+        self.high_threshold = high_threshold
+        self.low_threshold = low_threshold
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.min_hits = min_hits  # 匹配到的次数达到后才显示，过滤偶发误检
+        self.max_age = max_age  # 未匹配到检测框超过该秒数后删除轨迹
+        self.tracks = []
+        self.timestamp = None  # 最近一次检测的时刻
+
+    def reset(self):
+        self.tracks = []
+        self.timestamp = None
+
+    def _match(self, tracks, boxes, class_ids, threshold):
+        if not tracks or not len(boxes):
+            return []
+        predicted = np.array([track.filter.mean[:4] for track in tracks])
+        iou = box_iou(cxcywh_to_xyxy(predicted), boxes)
+        iou[np.array([track.class_id for track in tracks])[:, None] != class_ids[None, :]] = 0
+        return greedy_match(iou, threshold)
+
+    def update(self, boxes, confs, class_ids, timestamp):
+        """用一次检测结果更新轨迹，timestamp 为检测帧的采集时刻（秒）"""
+        for track in self.tracks:
+            track.filter.predict(timestamp)
+
+        high = np.flatnonzero(confs >= self.high_threshold)
+        low = np.flatnonzero((confs >= self.low_threshold) & (confs < self.high_threshold))
+
+        # 第一轮：高分检测框与全部轨迹匹配
+        matches = self._match(self.tracks, boxes[high], class_ids[high], self.match_iou)
+        for row, col in matches:
+            track = self.tracks[row]
+            index = high[col]
+            track.filter.update(boxes[index])
+            track.conf = float(confs[index])
+            track.hits += 1
+            track.last_seen = timestamp
+        matched_tracks = {row for row, _ in matches}
+        matched_high = {col for _, col in matches}
+
+        # 第二轮：剩余轨迹与低分检测框匹配（遮挡、模糊时置信度下降的目标），不更新显示的置信度
+        remaining = [track for index, track in enumerate(self.tracks) if index not in matched_tracks]
+        for row, col in self._match(remaining, boxes[low], class_ids[low], self.low_match_iou):
+            track = remaining[row]
+            track.filter.update(boxes[low[col]])
+            track.hits += 1
+            track.last_seen = timestamp
+
+        # 未匹配的高分检测框建立新轨迹，长时间未匹配的轨迹删除
+        for col, index in enumerate(high):
+            if col not in matched_high:
+                self.tracks.append(Track(next(self.ids), boxes[index], float(confs[index]),
+                                         int(class_ids[index]), timestamp))
+        self.tracks = [track for track in self.tracks if timestamp - track.last_seen <= self.max_age]
+        self.timestamp = timestamp
+
+    def predict(self, timestamp, max_extrapolation=0.5):
+        """返回外推到指定时刻的已确认轨迹 (boxes, confs, class_ids, track_ids)
+
+        只输出最近一次检测中匹配到的轨迹，检测长时间没有更新时最多外推 max_extrapolation 秒
+        """
+        visible = [track for track in self.tracks
+                   if track.last_seen == self.timestamp and track.hits >= self.min_hits]
+        if not visible:
+            return (np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32),
+                    np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        timestamp = min(timestamp, self.timestamp + max_extrapolation)
+        return (np.array([track.filter.box_at(timestamp) for track in visible], dtype=np.float32),
+                np.array([track.conf for track in visible], dtype=np.float32),
+                np.array([track.class_id for track in visible], dtype=np.int64),
+                np.array([track.track_id for track in visible], dtype=np.int64))
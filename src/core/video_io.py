@@ -0,0 +1,105 @@
+import os
+import json
+import threading
+import cv2
+from .pipeline import LatestFrameQueue, END_OF_STREAM
+
+SEEK_MIN_SKIP = 30  # 视频文件跳帧间隔不小于该值时直接定位到下一帧，而不是逐帧grab
+
+def is_stream_source(source):
+    """判断视频源是否为实时流（摄像头编号或 rtsp/http 等地址）"""
+    return str(source).isdigit() or '://' in str(source)
+
+class VideoReader:
+    """视频解码线程：提前解码帧放入有界队列，可按间隔跳帧
+
+    视频文件不丢帧，队列满时等待；实时流只保留最新帧
+    """
+
+    def __init__(self, source, frame_skip=1, queue_size=8):
+        self.source = source
+        self.is_stream = is_stream_source(source)
+        self.frame_skip = max(1, int(frame_skip))
+        self.capture = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.queue = LatestFrameQueue(maxsize=1 if self.is_stream else queue_size)
+        self.frames_read = 0
+        self._running = False
+        self._thread = None
+
+    def is_opened(self):
+        return self.capture.isOpened()
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join()
+        self.capture.release()
+
+    def _put(self, item):
+        """放入队列：实时流覆盖旧帧，视频文件等待空位"""
+        if self.is_stream:
+            self.queue.put(item)
+            return
+        while self._running and not self.queue.put_wait(item, timeout=0.1):
+            pass
+
+    def _decode_loop(self):
+        index = 0
+        seek = not self.is_stream and self.frame_skip >= SEEK_MIN_SKIP
+        while self._running:
+            # 跳过的帧用grab()读取：FFmpeg仍会解码，只省去取回和颜色转换；
+            # 间隔较大时定位到下一个要读的帧，只解码从关键帧到目标帧的部分
+            if not self.is_stream and index % self.frame_skip:
+                target = index - index % self.frame_skip + self.frame_skip
+                if seek and self.capture.set(cv2.CAP_PROP_POS_FRAMES, target):
+                    index = target
+                else:
+                    seek = False  # 不支持定位时退回逐帧grab
+                    if not self.capture.grab():
+                        break
+                    index += 1
+                self.frames_read = index
+                continue
+
+            ok, frame = self.capture.read()
+            if not ok:
+                break
+            self._put((index, frame))
+            index += 1
+            self.frames_read = index
+
+        self._put(END_OF_STREAM)
+
+
+class VideoRecorder:
+    """写出标注后的视频和逐帧检测日志（JSON Lines）"""
+
+    def __init__(self, output_dir, name, fps):
+        os.makedirs(output_dir, exist_ok=True)
+        self.fps = fps
+        self.video_path = os.path.join(output_dir, f"{name}_detect.mp4")
+        self.log_path = os.path.join(output_dir, f"{name}_detections.jsonl")
+        self._writer = None
+        self._log = open(self.log_path, 'w', encoding='utf-8')
+
+    def write(self, index, timestamp, frame, records):
+        """写出一帧及其检测结果"""
+        if self._writer is None:
+            h, w = frame.shape[:2]
+            self._writer = cv2.VideoWriter(self.video_path, cv2.VideoWriter_fourcc(*'mp4v'),
+                                           self.fps, (w, h))
+        self._writer.write(frame)
+        self._log.write(json.dumps({"frame": index, "time": round(timestamp, 3),
+                                    "detections": records}, ensure_ascii=False) + '\n')
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+        self._log.close()
@@ -0,0 +1,43 @@
+from PyQt5.QtWidgets import QComboBox
+from PyQt5.QtGui import QStandardItemModel, QStandardItem
+from PyQt5.QtCore import Qt
+
+class CheckableComboBox(QComboBox):
+    """支持多选的下拉框，点击条目切换勾选状态"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setModel(QStandardItemModel(self))
+        self.view().pressed.connect(self.on_item_pressed)
+        self._keep_popup = False
+
+    def addItem(self, text, userData=None):
+        """添加一个可勾选的条目"""
+        item = QStandardItem(text)
+        item.setData(userData, Qt.UserRole)
+        item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable)
+        item.setData(Qt.Unchecked, Qt.CheckStateRole)
+        self.model().appendRow(item)
+
+    def on_item_pressed(self, index):
+        """切换条目的勾选状态，并保持下拉列表打开"""
+        item = self.model().itemFromIndex(index)
+        checked = item.checkState() == Qt.Checked
+        item.setCheckState(Qt.Unchecked if checked else Qt.Checked)
+        self._keep_popup = True
+
+    def hidePopup(self):
+        """勾选条目时不关闭下拉列表"""
+        if self._keep_popup:
+            self._keep_popup = False
+            return
+        super().hidePopup()
+
+    def checked_items(self):
+        """返回所有已勾选条目的 [(数据, 文本)]"""
+        items = []
+        for row in range(self.model().rowCount()):
+            item = self.model().item(row)
+            if item.checkState() == Qt.Checked:
+                items.append((item.data(Qt.UserRole), item.text()))
+        return items
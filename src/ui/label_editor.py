@@ -1,16 +1,19 @@
-from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QTableWidget, 
-                           QTableWidgetItem, QHeaderView, QDialogButtonBox)
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, 
+                           QTableWidgetItem, QHeaderView, QDialogButtonBox,
+                           QPushButton)
 from PyQt5.QtCore import Qt
 from .styles import get_button_style
 
 class LabelEditorDialog(QDialog):
-    def __init__(self, class_names, custom_names, parent=None):
+    def __init__(self, class_names, custom_names, enabled_classes=None, parent=None):
         super().__init__(parent)
-        self.setWindowTitle("编辑标签名称")
-        self.setGeometry(200, 200, 500, 400)
+        self.setWindowTitle("编辑标签名称与检测类别")
+        self.setGeometry(200, 200, 560, 400)
         
         self.class_names = class_names
         self.custom_names = custom_names.copy()
+        # None表示检测全部类别
+        self.enabled_classes = set(enabled_classes) if enabled_classes is not None else None
         
         self.init_ui()
         
@@ -19,9 +22,10 @@ class LabelEditorDialog(QDialog):
         layout = QVBoxLayout()
         
         # 创建表格
-        self.table = QTableWidget(len(self.class_names), 2)
-        self.table.setHorizontalHeaderLabels(["原始标签", "显示名称"])
+        self.table = QTableWidget(len(self.class_names), 3)
+        self.table.setHorizontalHeaderLabels(["原始标签", "显示名称", "检测"])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)
         
         # 设置表格样式
         self.table.setStyleSheet("""
@@ -58,9 +62,28 @@ class LabelEditorDialog(QDialog):
             custom_name = self.custom_names.get(class_name, class_name)
             custom_item = QTableWidgetItem(custom_name)
             self.table.setItem(idx, 1, custom_item)
+            
+            # 是否检测该类别
+            enabled_item = QTableWidgetItem()
+            enabled_item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
+            enabled = self.enabled_classes is None or class_name in self.enabled_classes
+            enabled_item.setCheckState(Qt.Checked if enabled else Qt.Unchecked)
+            self.table.setItem(idx, 2, enabled_item)
         
         layout.addWidget(self.table)
         
+        # 全选/全不选按钮
+        select_layout = QHBoxLayout()
+        btn_select_all = QPushButton("全选")
+        btn_select_all.clicked.connect(lambda: self.set_all_checked(True))
+        btn_select_none = QPushButton("全不选")
+        btn_select_none.clicked.connect(lambda: self.set_all_checked(False))
+        for btn in [btn_select_all, btn_select_none]:
+            btn.setStyleSheet(get_button_style())
+            select_layout.addWidget(btn)
+        select_layout.addStretch()
+        layout.addLayout(select_layout)
+        
         # 添加按钮
         button_box = QDialogButtonBox(
             QDialogButtonBox.Ok | QDialogButtonBox.Cancel
@@ -82,4 +105,19 @@ class LabelEditorDialog(QDialog):
             custom = self.table.item(idx, 1).text()
             if original != custom:  # 只保存被修改的标签
                 custom_names[original] = custom
-        return custom_names 
\ No newline at end of file
+        return custom_names
+    
+    def set_all_checked(self, checked):
+        """勾选或取消勾选所有类别"""
+        state = Qt.Checked if checked else Qt.Unchecked
+        for idx in range(self.table.rowCount()):
+            self.table.item(idx, 2).setCheckState(state)
+    
+    def get_enabled_classes(self):
+        """获取允许检测的类别，全部勾选时返回None"""
+        enabled = [self.table.item(idx, 0).text()
+                   for idx in range(self.table.rowCount())
+                   if self.table.item(idx, 2).checkState() == Qt.Checked]
+        if len(enabled) == self.table.rowCount():
+            return None
+        return enabled
\ No newline at end of file
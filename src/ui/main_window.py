@@ -4,37 +4,85 @@ import numpy as np
 import json
 import os
 import time
-import torch
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                            QPushButton, QLabel, QFileDialog, QComboBox,
                            QTextEdit, QSplitter, QInputDialog, QMessageBox,
                            QApplication, QFrame)
 from PyQt5.QtCore import Qt, QTimer, QPoint
-from PyQt5.QtGui import QImage, QPixmap, QIcon, QFont
-from ultralytics import YOLO
+from PyQt5.QtGui import QImage, QPixmap, QIcon, QFont, QPainter, QColor
 
 from .styles import (get_dark_palette, get_button_style, get_combobox_style,
                     get_text_edit_style, get_label_style, get_window_style)
 from .label_editor import LabelEditorDialog
 from .progress_dialog import ProgressDialog
 from .install_thread import PyTorchInstallThread
+from .model_load_thread import ModelLoadThread, MLImportThread, ImgszBenchmarkThread
+from .roi_label import RoiLabel
+from .check_combo import CheckableComboBox
+from .perf_panel import PerfPanel
 from ..core.detection_thread import DetectionThread
+from ..core.frame_pacer import FramePacer
+from ..core.change_detector import DEFAULT_CHANGE_THRESHOLD, SUGGESTED_CHANGE_THRESHOLD
+from ..core.tracker import DEFAULT_DETECT_INTERVAL
+from ..core.tiling import DEFAULT_TILE_OVERLAP
+from ..core.stage_timer import format_overlay
+from ..core.metrics import DetectionMetrics, MetricsServer
+from ..core.model_loader import BACKENDS, default_backend
+from ..core.quantize import PRECISIONS
+from ..core.model_cache import ModelCache, MAX_CACHE_SIZE_MB
+from ..core.imgsz_tuner import IMGSZ_OPTIONS, DEFAULT_IMGSZ, ImgszTuner
 from ..utils.window_utils import get_window_list
+from ..utils.monitor_utils import get_monitor_list, ALL_MONITORS
 from ..utils.cuda_utils import (get_cuda_version, uninstall_pytorch,
                               install_pytorch)
 
 class YoloDetector(QMainWindow):
-    def __init__(self, is_cuda_available):
+    def __init__(self, is_cuda_available=None, start_time=None, metrics_port=0):
         super().__init__()
+        self.start_time = start_time or time.perf_counter()  # 程序启动时刻，用于统计启动耗时
+        self.metrics_port = metrics_port  # 指标接口端口，0为不开启
+        self.metrics = None
+        self.metrics_server = None
         self.model = None
+        self.model_path = 'yolov8s.pt'
+        self.backend = None  # 当前实际使用的推理后端
+        self.precision = None  # 当前实际使用的推理精度
+        self.imgsz_timings = {}  # 各模型的推理尺寸基准测试结果
         self.custom_labels = {}
+        self.class_filter = None  # 允许检测的类别名称，None表示全部类别
         self.detection_thread = None
         self.install_thread = None
+        self.model_load_thread = None
+        self.imgsz_benchmark_thread = None
+        self.ml_import_thread = None
+        self.load_progress = None
+        self._window_shown = False
+        self._first_detection_start = None  # 开始检测的时刻，首帧显示后清空
+        self._first_detection_logged = False
         self.confidence_threshold = 0.25
+        self.pacing_mode = 'target'
+        self.frame_overruns = 0
+        self.dropped_frames = 0
+        self.skip_ratio = None  # 每秒内因画面未变化而省去的推理比例
+        self.change_threshold = DEFAULT_CHANGE_THRESHOLD
+        self.detect_interval = 0  # 目标跟踪的检测间隔帧数，0为不跟踪
+        self.track_summary = None  # 跟踪模式下最近一帧各类别的目标数
+        self.tiling = False
+        self.tile_overlap = DEFAULT_TILE_OVERLAP
+        self.perf_panel = None
+        self.perf_overlay = False  # 是否在预览画面上叠加各阶段耗时
+        self._overlay_lines = []
+        self._overlay_time = 0.0
+        self.target_fps = 30
         self.is_cuda_available = is_cuda_available
         self.is_detecting = False
         self.detect_mode = None
         self.selected_window = None
+        self.rois = []  # 全屏检测区域（屏幕坐标）
+        self.selected_monitor = 0
+        self.source_labels = None  # 多画面检测时最近一帧各画面的标签
+        self._pending_frame = None  # 等待绘制的最新一帧
+        self._paint_scheduled = False
         
         # 窗口无边框设置
         self.setWindowFlags(Qt.FramelessWindowHint)
@@ -46,8 +94,41 @@ class YoloDetector(QMainWindow):
         self._normal_geometry = None
         
         self.init_ui()
+        self.backend_config = self.load_backend_config()
+        self.model_cache = ModelCache(max_size_mb=self.backend_config['cache_size_mb'])
+        # torch/ultralytics 的导入、CUDA检查和默认模型的加载都在窗口显示后于后台进行
+        
+    def showEvent(self, event):
+        """窗口首次显示后记录启动耗时，并开始在后台加载默认模型"""
+        super().showEvent(event)
+        if not self._window_shown:
+            self._window_shown = True
+            QTimer.singleShot(0, self.on_first_show)
+            
+    def on_first_show(self):
+        self.log_message(f"窗口启动耗时: {time.perf_counter() - self.start_time:.2f}s")
+        if self.metrics_port:
+            self.start_metrics_server()
+        self.log_message("正在后台加载PyTorch...")
+        self.ml_import_thread = MLImportThread()
+        self.ml_import_thread.ready.connect(self.on_ml_ready)
+        self.ml_import_thread.failed.connect(self.on_ml_import_failed)
+        self.ml_import_thread.start()
+        
+    def on_ml_ready(self, is_cuda_available, import_time):
+        """PyTorch导入完成后检查安装情况并加载默认模型"""
+        if self.is_cuda_available is None:
+            self.is_cuda_available = is_cuda_available
+        self.log_message(f"PyTorch导入耗时: {import_time:.2f}s")
+        self.log_message(f"设备类型: {'GPU' if self.is_cuda_available else 'CPU'}")
+        if self.backend_config['backend'] is None:
+            self.backend_config['backend'] = default_backend(self.is_cuda_available)
+        self.check_pytorch_installation()
+        self.load_model(self.model_path)
+        
+    def on_ml_import_failed(self, message):
+        self.log_message(f"PyTorch导入失败: {message}")
         self.check_pytorch_installation()
-        self.load_model('yolov8s.pt')  # 加载默认模型
         
     def init_ui(self):
         """初始化UI"""
@@ -173,7 +254,9 @@ class YoloDetector(QMainWindow):
         left_layout = QVBoxLayout(left_widget)
         
         # 检测显示区域
-        self.display_label = QLabel()
+        self.display_label = RoiLabel()
+        self.display_label.roi_selected.connect(self.add_roi)
+        self.display_label.roi_cleared.connect(self.clear_rois)
         self.display_label.setAlignment(Qt.AlignCenter)
         self.display_label.setMinimumSize(640, 480)
         self.display_label.setStyleSheet("""
@@ -185,11 +268,16 @@ class YoloDetector(QMainWindow):
         """)
         left_layout.addWidget(self.display_label, 3)
         
-        # FPS显示
+        # 推理后端和FPS显示
+        status_layout = QHBoxLayout()
+        self.backend_label = QLabel("后端: --")
+        self.backend_label.setStyleSheet(get_label_style())
+        status_layout.addWidget(self.backend_label)
         self.fps_label = QLabel("FPS: --")
         self.fps_label.setStyleSheet(get_label_style())
         self.fps_label.setAlignment(Qt.AlignRight)
-        left_layout.addWidget(self.fps_label)
+        status_layout.addWidget(self.fps_label)
+        left_layout.addLayout(status_layout)
         
         # 底部按钮区域
         button_layout = QHBoxLayout()
@@ -219,8 +307,9 @@ class YoloDetector(QMainWindow):
         
         # 窗口选择区域
         window_layout = QHBoxLayout()
-        self.window_combo = QComboBox(self)
+        self.window_combo = CheckableComboBox(self)
         self.window_combo.setStyleSheet(get_combobox_style())
+        self.window_combo.setToolTip("可勾选多个窗口同时检测")
         self.update_window_list()
         self.window_combo.setEnabled(False)
         
@@ -234,6 +323,15 @@ class YoloDetector(QMainWindow):
         window_layout.addWidget(self.window_combo)
         window_layout.addWidget(self.btn_refresh_windows)
         
+        # 显示器选择
+        self.monitor_combo = QComboBox(self)
+        self.monitor_combo.setStyleSheet(get_combobox_style())
+        self.monitor_combo.setToolTip("选择全屏检测的显示器")
+        for index, title in get_monitor_list():
+            self.monitor_combo.addItem(title, index)
+        self.monitor_combo.currentIndexChanged.connect(self.on_monitor_changed)
+        self.monitor_combo.setEnabled(False)
+        
         # 添加所有按钮到布局
         self.add_buttons_to_layout(button_layout, window_layout)
         left_layout.addLayout(button_layout)
@@ -293,7 +391,6 @@ class YoloDetector(QMainWindow):
         
         # 初始日志信息
         self.log_message("程序已启动")
-        self.log_message(f"设备类型: {'GPU' if self.is_cuda_available else 'CPU'}")
         self.log_message(f"默认置信度阈值: {self.confidence_threshold:.2f}")
         
     def create_buttons(self):
@@ -306,6 +403,10 @@ class YoloDetector(QMainWindow):
         self.btn_window.clicked.connect(self.toggle_window_detection)
         self.btn_window.setEnabled(False)
         
+        self.btn_video = QPushButton('视频检测', self)
+        self.btn_video.clicked.connect(self.toggle_video_detection)
+        self.btn_video.setEnabled(False)
+        
         self.btn_image = QPushButton('图片检测', self)
         self.btn_image.clicked.connect(self.detect_image)
         self.btn_image.setEnabled(False)
@@ -316,32 +417,146 @@ class YoloDetector(QMainWindow):
         
         self.btn_load_model = QPushButton('加载模型', self)
         self.btn_load_model.clicked.connect(self.load_custom_model)
+        self.btn_load_model.setEnabled(False)
         
         self.btn_set_confidence = QPushButton('设置置信度', self)
         self.btn_set_confidence.clicked.connect(self.set_confidence_threshold)
         self.btn_set_confidence.setEnabled(False)
         
+        self.btn_set_pacing = QPushButton('帧率模式', self)
+        self.btn_set_pacing.clicked.connect(self.set_pacing_mode)
+        self.btn_set_pacing.setEnabled(False)
+        
+        self.btn_set_backend = QPushButton('推理后端', self)
+        self.btn_set_backend.clicked.connect(self.set_backend)
+        self.btn_set_backend.setEnabled(False)
+        
+        self.btn_set_imgsz = QPushButton('推理尺寸', self)
+        self.btn_set_imgsz.clicked.connect(self.set_imgsz)
+        self.btn_set_imgsz.setEnabled(False)
+        
+        self.btn_set_change = QPushButton('静止跳过', self)
+        self.btn_set_change.clicked.connect(self.set_change_threshold)
+        self.btn_set_change.setEnabled(False)
+        
+        self.btn_set_tracking = QPushButton('目标跟踪', self)
+        self.btn_set_tracking.clicked.connect(self.set_tracking)
+        self.btn_set_tracking.setEnabled(False)
+        
+        self.btn_set_tiling = QPushButton('切片推理', self)
+        self.btn_set_tiling.clicked.connect(self.set_tiling)
+        self.btn_set_tiling.setEnabled(False)
+        
+        self.btn_perf_panel = QPushButton('性能面板', self)
+        self.btn_perf_panel.clicked.connect(self.show_perf_panel)
+        
         # 设置按钮样式
-        for btn in [self.btn_fullscreen, self.btn_window, self.btn_image,
+        for btn in [self.btn_fullscreen, self.btn_window, self.btn_video, self.btn_image,
                    self.btn_edit_labels, self.btn_load_model, 
-                   self.btn_set_confidence]:
+                   self.btn_set_confidence, self.btn_set_pacing, self.btn_set_backend,
+                   self.btn_set_imgsz, self.btn_set_change, self.btn_set_tracking,
+                   self.btn_set_tiling, self.btn_perf_panel]:
             btn.setStyleSheet(get_button_style())
             
     def add_buttons_to_layout(self, button_layout, window_layout):
         """将按钮添加到布局中"""
         button_layout.addWidget(self.btn_load_model)
+        button_layout.addWidget(self.btn_set_backend)
+        button_layout.addWidget(self.monitor_combo)
         button_layout.addWidget(self.btn_fullscreen)
         button_layout.addWidget(self.btn_window)
         button_layout.addLayout(window_layout)
+        button_layout.addWidget(self.btn_video)
         button_layout.addWidget(self.btn_image)
         button_layout.addWidget(self.btn_edit_labels)
         button_layout.addWidget(self.btn_set_confidence)
+        button_layout.addWidget(self.btn_set_pacing)
+        button_layout.addWidget(self.btn_set_imgsz)
+        button_layout.addWidget(self.btn_set_change)
+        button_layout.addWidget(self.btn_set_tracking)
+        button_layout.addWidget(self.btn_set_tiling)
+        button_layout.addWidget(self.btn_perf_panel)
+        
+    def capture_shape(self):
+        """返回主屏幕截图的帧尺寸 (高, 宽, 3)，用于预热模型"""
+        screen = QApplication.primaryScreen()
+        if screen is None:
+            return (1080, 1920, 3)
+        ratio = screen.devicePixelRatio()
+        size = screen.size()
+        return (int(size.height() * ratio), int(size.width() * ratio), 3)
         
     def load_model(self, model_path):
-        """加载模型"""
+        """在后台线程加载并预热模型，加载期间显示进度对话框"""
+        if self.model_load_thread and self.model_load_thread.isRunning():
+            self.log_message("模型正在加载中，请稍候")
+            return
+            
+        self.enable_buttons(False)
+        self.btn_load_model.setEnabled(False)
+        self.btn_set_backend.setEnabled(False)
+        
+        self.load_progress = ProgressDialog(self, "加载模型")
+        self.load_progress.setWindowModality(Qt.ApplicationModal)
+        self.load_progress.show()
+        
+        benchmark = (self.backend_config['imgsz'] == 'auto' and
+                     (model_path, self.backend_config['backend']) not in self.imgsz_timings)
+        self.model_load_thread = ModelLoadThread(model_path, self.backend_config,
+                                                 self.model_cache, self.capture_shape(),
+                                                 benchmark)
+        self.model_load_thread.progress.connect(self.on_model_load_progress)
+        self.model_load_thread.loaded.connect(self.on_model_loaded)
+        self.model_load_thread.failed.connect(self.on_model_load_failed)
+        self.model_load_thread.start()
+        
+    def on_model_load_progress(self, message):
+        """显示模型加载进度"""
+        if self.load_progress:
+            self.load_progress.set_status(message)
+        self.log_message(message)
+        
+    def close_load_progress(self):
+        if self.load_progress:
+            self.load_progress.close()
+            self.load_progress = None
+        self.btn_load_model.setEnabled(True)
+        self.btn_set_backend.setEnabled(True)
+        
+    def on_model_load_failed(self, message):
+        """模型加载失败"""
+        self.close_load_progress()
+        self.log_message(f"模型加载失败: {message}")
+        self.model = None
+        self.backend = None
+        self.update_backend_label()
+        self.enable_buttons(False)
+        
+    def start_metrics_server(self):
+        """在本机端口开启 Prometheus 指标接口"""
+        self.metrics = DetectionMetrics()
+        self.metrics_server = MetricsServer(self.metrics, self.metrics_port)
         try:
-            self.log_message(f"正在加载模型: {model_path}")
-            self.model = YOLO(model_path)
+            self.metrics_server.start()
+            self.log_message(f"指标接口: {self.metrics_server.url}")
+        except OSError as e:
+            self.metrics_server = None
+            self.log_message(f"指标接口启动失败（端口 {self.metrics_port}）: {str(e)}")
+
+    def on_model_loaded(self, result):
+        """模型在后台加载完成后创建检测线程"""
+        self.close_load_progress()
+        model_path = result['model_path']
+        try:
+            self.model = result['model']
+            self.backend = result['backend']
+            self.precision = result['precision']
+            self.model_path = model_path
+            self.update_backend_label()
+            if result['timings']:
+                self.imgsz_timings[(model_path, self.backend)] = result['timings']
+                self.log_message("推理耗时: " + "，".join(
+                    f"{size}: {seconds * 1000:.0f}ms" for size, seconds in result['timings'].items()))
             
             # 初始化检测线程
             if self.detection_thread:
@@ -352,39 +567,174 @@ class YoloDetector(QMainWindow):
             self.detection_thread.detection_complete.connect(self.display_frame)
             self.detection_thread.log_message.connect(self.log_message)
             self.detection_thread.fps_update.connect(self.update_fps)
+            self.detection_thread.finished.connect(self.on_detection_finished)
+            self.detection_thread.source_labels_update.connect(self.update_source_labels)
+            self.detection_thread.pacing_update.connect(self.update_pacing)
+            self.detection_thread.dropped_update.connect(self.update_dropped)
+            self.detection_thread.skip_update.connect(self.update_skip_ratio)
+            self.detection_thread.change_detector.threshold = self.change_threshold
+            self.detection_thread.track_summary_update.connect(self.update_track_summary)
+            self.detection_thread.detect_interval = self.detect_interval
+            self.detection_thread.tiling = self.tiling
+            self.detection_thread.tile_overlap = self.tile_overlap
             self.detection_thread.confidence_threshold = self.confidence_threshold
+            self.detection_thread.frame_pacer.set_mode(self.pacing_mode, self.target_fps)
+            self.detection_thread.selected_monitor = self.selected_monitor
+            if self.metrics is not None:
+                # 共用累计的阶段耗时，重新加载模型后直方图继续累计
+                self.detection_thread.stage_timings = self.metrics.stage_timings
+                self.detection_thread.metrics = self.metrics
+                self.metrics.set_model(result['load_time'] + result['warmup_time'],
+                                       model_path, self.backend, self.precision)
+            self.update_preview_size()
+            self.apply_imgsz()
             
             # 加载自定义标签
             self.custom_labels = self.load_custom_labels()
             self.detection_thread.set_custom_labels(self.custom_labels)
             
+            # 加载类别过滤
+            self.class_filter = self.load_class_filter()
+            self.detection_thread.class_filter = self.get_class_filter_ids()
+            
             # 启用按钮
             self.enable_buttons(True)
             
             self.log_message(f"模型加载成功")
             self.log_message(f"检测类别数: {len(self.model.names)}")
             self.log_message(f"模型路径: {model_path}")
+            self.log_message(f"推理后端: {BACKENDS[self.backend]} {PRECISIONS[self.precision]}")
+            self.log_message(f"模型加载耗时: {result['load_time']:.2f}s，"
+                             f"预热耗时: {result['warmup_time']:.2f}s，"
+                             f"启动至今: {time.perf_counter() - self.start_time:.2f}s")
+        except Exception as e:
+            self.on_model_load_failed(str(e))
             
-            return True
+    def load_backend_config(self):
+        """从文件加载推理后端设置，没有时按是否有GPU选择默认后端"""
+        # 未设置后端时等CUDA检查完成后再按是否有GPU选择
+        config = {"backend": None, "num_threads": 0,
+                  "cache_size_mb": MAX_CACHE_SIZE_MB, "imgsz": DEFAULT_IMGSZ,
+                  "precision": "fp32", "calibration_dir": "示例"}
+        try:
+            if os.path.exists('backend_config.json'):
+                with open('backend_config.json', 'r') as f:
+                    config.update(json.load(f))
         except Exception as e:
-            self.log_message(f"模型加载失败: {str(e)}")
-            self.model = None
-            self.enable_buttons(False)
-            return False
+            self.log_message(f"加载推理后端设置失败: {str(e)}")
+        if config['backend'] is not None and config['backend'] not in BACKENDS:
+            config['backend'] = 'pytorch'
+        if config['precision'] not in PRECISIONS:
+            config['precision'] = 'fp32'
+        if config['imgsz'] != 'auto' and config['imgsz'] not in IMGSZ_OPTIONS:
+            config['imgsz'] = DEFAULT_IMGSZ
+        return config
+        
+    def save_backend_config(self):
+        """保存推理后端设置到文件"""
+        try:
+            with open('backend_config.json', 'w') as f:
+                json.dump(self.backend_config, f)
+        except Exception as e:
+            self.log_message(f"保存推理后端设置失败: {str(e)}")
+            
+    def update_backend_label(self):
+        """显示当前使用的推理后端"""
+        if self.backend is None:
+            self.backend_label.setText("后端: --")
+            return
+        threads = self.backend_config['num_threads']
+        device = 'GPU' if self.backend == 'pytorch' and self.is_cuda_available else 'CPU'
+        thread_text = f"{threads}线程" if threads > 0 else "自动线程"
+        self.backend_label.setText(f"后端: {BACKENDS[self.backend]} {PRECISIONS[self.precision]} "
+                                   f"({device}, {thread_text})")
+        
+    def set_backend(self):
+        """设置推理后端和CPU推理线程数，并重新加载当前模型"""
+        backends = list(BACKENDS.keys())
+        backend_names = [BACKENDS[backend] for backend in backends]
+        backend_name, ok = QInputDialog.getItem(
+            self,
+            "设置推理后端",
+            "请选择推理后端（ONNX Runtime/OpenVINO 适合无GPU的电脑）:",
+            backend_names,
+            backends.index(self.backend_config['backend']),
+            False
+        )
+        if not ok:
+            return
+            
+        num_threads, ok = QInputDialog.getInt(
+            self,
+            "设置推理线程数",
+            "请输入CPU推理线程数 (0 为自动):",
+            value=self.backend_config['num_threads'],
+            min=0,
+            max=os.cpu_count() or 64
+        )
+        if not ok:
+            return
+            
+        backend = backends[backend_names.index(backend_name)]
+        precision = 'fp32'
+        if backend != 'pytorch':
+            precisions = list(PRECISIONS.keys())
+            precision_names = [PRECISIONS[p] for p in precisions]
+            precision_name, ok = QInputDialog.getItem(
+                self,
+                "设置推理精度",
+                "请选择推理精度（INT8 首次使用时用校准图片量化，速度更快，精度略有下降）:",
+                precision_names,
+                precisions.index(self.backend_config['precision']),
+                False
+            )
+            if not ok:
+                return
+            precision = precisions[precision_names.index(precision_name)]
             
+        self.backend_config['backend'] = backend
+        self.backend_config['num_threads'] = num_threads
+        self.backend_config['precision'] = precision
+        self.save_backend_config()
+        if self.is_detecting:
+            self.stop_detection()
+        self.load_model(self.model_path)
+        
     def enable_buttons(self, enabled):
         """启用或禁用按钮"""
         self.btn_fullscreen.setEnabled(enabled)
         self.btn_window.setEnabled(enabled)
+        self.btn_video.setEnabled(enabled)
         self.btn_image.setEnabled(enabled)
         self.btn_edit_labels.setEnabled(enabled)
         self.window_combo.setEnabled(enabled)
+        self.monitor_combo.setEnabled(enabled)
         self.btn_refresh_windows.setEnabled(enabled)
         self.btn_set_confidence.setEnabled(enabled)
+        self.btn_set_pacing.setEnabled(enabled)
+        self.btn_set_imgsz.setEnabled(enabled)
+        self.btn_set_change.setEnabled(enabled)
+        self.btn_set_tracking.setEnabled(enabled)
+        self.btn_set_tiling.setEnabled(enabled)
         
     def update_fps(self, fps):
         """更新FPS显示"""
-        self.fps_label.setText(f"FPS: {fps:.1f}")
+        text = f"FPS: {fps:.1f}  超预算: {self.frame_overruns}  丢帧: {self.dropped_frames}"
+        if self.skip_ratio is not None:
+            text += f"  跳过: {self.skip_ratio * 100:.0f}%"
+        self.fps_label.setText(text)
+        
+    def update_pacing(self, overruns):
+        """更新每秒超出帧预算的次数"""
+        self.frame_overruns = overruns
+        
+    def update_dropped(self, dropped):
+        """更新累计丢帧数"""
+        self.dropped_frames = dropped
+        
+    def update_skip_ratio(self, ratio):
+        """更新每秒因画面未变化而省去的推理比例"""
+        self.skip_ratio = ratio if self.change_threshold > 0 else None
         
     def load_custom_model(self):
         """加载自定义模型"""
@@ -433,6 +783,34 @@ class YoloDetector(QMainWindow):
         except Exception as e:
             self.log_message(f"保存自定义标签失败: {str(e)}")
             
+    def load_class_filter(self):
+        """从文件加载允许检测的类别"""
+        class_filter = None
+        try:
+            if os.path.exists('class_filter.json'):
+                with open('class_filter.json', 'r') as f:
+                    class_filter = json.load(f)
+                if class_filter is not None:
+                    self.log_message(f"已加载类别过滤: {len(class_filter)} 个类别")
+        except Exception as e:
+            self.log_message(f"加载类别过滤失败: {str(e)}")
+        return class_filter
+        
+    def save_class_filter(self):
+        """保存允许检测的类别到文件"""
+        try:
+            with open('class_filter.json', 'w') as f:
+                json.dump(self.class_filter, f)
+        except Exception as e:
+            self.log_message(f"保存类别过滤失败: {str(e)}")
+            
+    def get_class_filter_ids(self):
+        """将允许检测的类别名称转换为当前模型的类别ID"""
+        if self.class_filter is None or self.model is None:
+            return None
+        allowed = set(self.class_filter)
+        return [idx for idx, name in self.model.names.items() if name in allowed]
+        
     def edit_labels(self):
         """打开标签编辑对话框"""
         if self.model is None:
@@ -440,7 +818,8 @@ class YoloDetector(QMainWindow):
             return
             
         original_labels = list(self.model.names.values())
-        dialog = LabelEditorDialog(original_labels, self.custom_labels, self)
+        dialog = LabelEditorDialog(original_labels, self.custom_labels,
+                                   self.class_filter, self)
         
         if dialog.exec_() == dialog.Accepted:
             self.custom_labels = dialog.get_custom_names()
@@ -448,6 +827,10 @@ class YoloDetector(QMainWindow):
             self.save_custom_labels()
             self.log_message("标签名称已更新")
             
+            self.class_filter = dialog.get_enabled_classes()
+            self.detection_thread.set_class_filter(self.get_class_filter_ids())
+            self.save_class_filter()
+            
     def update_window_list(self):
         """更新窗口列表"""
         self.log_message("正在刷新窗口列表...")
@@ -479,6 +862,201 @@ class YoloDetector(QMainWindow):
                 self.detection_thread.set_confidence_threshold(new_threshold)
             self.log_message(f"置信度阈值已设置为: {new_threshold:.2f}")
             
+    def set_pacing_mode(self):
+        """设置帧率模式"""
+        if self.detection_thread is None:
+            self.log_message("错误: 未加载模型，请先加载模型")
+            return
+            
+        modes = list(FramePacer.MODES.keys())
+        mode_names = [FramePacer.MODES[mode] for mode in modes]
+        mode_name, ok = QInputDialog.getItem(
+            self,
+            "设置帧率模式",
+            "请选择帧率模式:",
+            mode_names,
+            modes.index(self.pacing_mode),
+            False
+        )
+        if not ok:
+            return
+        mode = modes[mode_names.index(mode_name)]
+        
+        if mode == 'target':
+            target_fps, ok = QInputDialog.getInt(
+                self,
+                "设置目标帧率",
+                "请输入目标帧率 (1 - 240):",
+                value=self.target_fps,
+                min=1,
+                max=240
+            )
+            if not ok:
+                return
+            self.target_fps = target_fps
+            
+        self.pacing_mode = mode
+        self.detection_thread.set_pacing(self.pacing_mode, self.target_fps)
+        
+    def set_change_threshold(self):
+        """设置静止画面跳过推理的变化阈值，0为每帧都推理"""
+        if self.detection_thread is None:
+            self.log_message("错误: 未加载模型，请先加载模型")
+            return
+            
+        threshold, ok = QInputDialog.getDouble(
+            self,
+            "设置静止跳过",
+            "画面变化阈值（缩略图灰度差 0 - 255，0 为关闭）:",
+            value=self.change_threshold or SUGGESTED_CHANGE_THRESHOLD,
+            min=0.0,
+            max=255.0,
+            decimals=1
+        )
+        if ok:
+            self.change_threshold = threshold
+            self.detection_thread.set_change_threshold(threshold)
+            
+    def set_tracking(self):
+        """设置目标跟踪：每隔N帧检测一次，中间帧由跟踪器外推检测框"""
+        if self.detection_thread is None:
+            self.log_message("错误: 未加载模型，请先加载模型")
+            return
+            
+        interval, ok = QInputDialog.getInt(
+            self,
+            "设置目标跟踪",
+            "每隔几帧检测一次（1 - 30，0 为关闭跟踪）:",
+            value=self.detect_interval or DEFAULT_DETECT_INTERVAL,
+            min=0,
+            max=30
+        )
+        if ok:
+            self.detect_interval = interval
+            self.detection_thread.set_tracking(interval)
+            
+    def set_tiling(self):
+        """设置切片推理，高分辨率画面切成重叠的切片推理以检测小目标"""
+        if self.detection_thread is None:
+            self.log_message("错误: 未加载模型，请先加载模型")
+            return
+            
+        options = ["关闭", "开启"]
+        option, ok = QInputDialog.getItem(
+            self,
+            "设置切片推理",
+            "画面大于推理尺寸时切成重叠的切片分别推理，小目标更不容易漏检:",
+            options,
+            int(self.tiling),
+            False
+        )
+        if not ok:
+            return
+        tiling = option == "开启"
+        
+        if tiling:
+            overlap, ok = QInputDialog.getDouble(
+                self,
+                "设置切片重叠",
+                "相邻切片的重叠比例 (0.0 - 0.5):",
+                value=self.tile_overlap,
+                min=0.0,
+                max=0.5,
+                decimals=2
+            )
+            if not ok:
+                return
+            self.tile_overlap = overlap
+            
+        self.tiling = tiling
+        self.detection_thread.set_tiling(self.tiling, self.tile_overlap)
+        
+    def set_imgsz(self):
+        """设置推理尺寸，自动模式下按目标帧率选择尺寸"""
+        if self.detection_thread is None:
+            self.log_message("错误: 未加载模型，请先加载模型")
+            return
+            
+        options = ['auto'] + list(IMGSZ_OPTIONS)
+        option_names = ['自动'] + [str(imgsz) for imgsz in IMGSZ_OPTIONS]
+        option_name, ok = QInputDialog.getItem(
+            self,
+            "设置推理尺寸",
+            "请选择推理尺寸（尺寸越小越快，小目标越容易漏检）:",
+            option_names,
+            options.index(self.backend_config['imgsz']),
+            False
+        )
+        if not ok:
+            return
+            
+        self.backend_config['imgsz'] = options[option_names.index(option_name)]
+        self.save_backend_config()
+        self.apply_imgsz()
+        
+    def apply_imgsz(self):
+        """把推理尺寸设置应用到检测线程，自动模式下首次使用模型时先在后台做基准测试"""
+        imgsz = self.backend_config['imgsz']
+        if imgsz != 'auto':
+            self.detection_thread.set_imgsz(imgsz)
+            return
+            
+        key = (self.model_path, self.backend)
+        if key not in self.imgsz_timings:
+            self.start_imgsz_benchmark(key)
+            return
+            
+        tuner = ImgszTuner(self.detection_thread.tuning_fps)
+        tuner.calibrate(self.imgsz_timings[key])
+        self.detection_thread.set_imgsz(None, tuner)
+        
+    def start_imgsz_benchmark(self, key):
+        """在后台测试各推理尺寸的耗时，测试期间暂停检测，避免与检测线程同时调用模型"""
+        if self.imgsz_benchmark_thread and self.imgsz_benchmark_thread.isRunning():
+            return
+            
+        # 屏幕检测测试完后继续，视频检测重新开始会从头播放，直接停止
+        resume = self.detection_thread.isRunning() and self.detect_mode != 'video'
+        if self.detection_thread.isRunning():
+            if resume:
+                self.detection_thread.stop()
+                self.detection_thread.wait()
+            else:
+                self.stop_detection()
+                
+        self.enable_buttons(False)
+        self.load_progress = ProgressDialog(self, "测试推理尺寸")
+        self.load_progress.setWindowModality(Qt.ApplicationModal)
+        self.load_progress.show()
+        self.on_model_load_progress("正在测试各推理尺寸的耗时...")
+        
+        self.imgsz_benchmark_thread = ImgszBenchmarkThread(self.model, self.capture_shape())
+        self.imgsz_benchmark_thread.done.connect(
+            lambda timings: self.on_imgsz_benchmarked(key, timings, resume))
+        self.imgsz_benchmark_thread.failed.connect(
+            lambda message: self.on_imgsz_benchmark_failed(message, resume))
+        self.imgsz_benchmark_thread.start()
+        
+    def on_imgsz_benchmarked(self, key, timings, resume):
+        """推理尺寸测试完成后启用自动尺寸，并恢复暂停的检测"""
+        self.close_load_progress()
+        self.enable_buttons(True)
+        self.imgsz_timings[key] = timings
+        self.log_message("推理耗时: " + "，".join(
+            f"{size}: {seconds * 1000:.0f}ms" for size, seconds in timings.items()))
+        if key == (self.model_path, self.backend):
+            self.apply_imgsz()
+        if resume and self.is_detecting:
+            self.detection_thread.start()
+            
+    def on_imgsz_benchmark_failed(self, message, resume):
+        self.close_load_progress()
+        self.enable_buttons(True)
+        self.log_message(f"推理尺寸测试失败: {message}，使用默认尺寸 {DEFAULT_IMGSZ}")
+        self.detection_thread.set_imgsz(DEFAULT_IMGSZ)
+        if resume and self.is_detecting:
+            self.detection_thread.start()
+        
     def toggle_fullscreen_detection(self):
         """切换全屏检测状态"""
         if self.model is None:
@@ -497,17 +1075,80 @@ class YoloDetector(QMainWindow):
             return
             
         if not self.is_detecting or self.detect_mode != 'window':
-            hwnd = self.window_combo.currentData()
-            title = self.window_combo.currentText()
-            if hwnd:
-                self.start_detection('window', hwnd, title)
+            # 优先使用勾选的窗口，未勾选时使用当前选中的窗口
+            windows = self.window_combo.checked_items()
+            if not windows and self.window_combo.currentData():
+                windows = [(self.window_combo.currentData(), self.window_combo.currentText())]
+            if windows:
+                self.start_detection('window', windows)
             else:
                 self.log_message("请先选择一个窗口")
         else:
             self.stop_detection()
             
-    def start_detection(self, mode, hwnd=None, title=None):
-        """开始检测"""
+    def toggle_video_detection(self):
+        """切换视频检测状态"""
+        if self.model is None:
+            self.log_message("错误: 未加载模型，请先加载模型")
+            return
+            
+        if self.is_detecting and self.detect_mode == 'video':
+            self.stop_detection()
+            return
+            
+        source_type, ok = QInputDialog.getItem(
+            self,
+            "视频检测",
+            "请选择视频来源:",
+            ["视频文件", "视频流地址"],
+            0,
+            False
+        )
+        if not ok:
+            return
+            
+        if source_type == "视频文件":
+            source, _ = QFileDialog.getOpenFileName(
+                self,
+                "选择视频",
+                "",
+                "视频文件 (*.mp4 *.avi *.mkv *.mov *.flv)"
+            )
+        else:
+            source, ok = QInputDialog.getText(
+                self,
+                "视频流地址",
+                "请输入视频流地址 (如 rtsp://127.0.0.1:8554/live) 或摄像头编号:"
+            )
+            source = source.strip() if ok else ""
+        if not source:
+            return
+            
+        frame_skip = 1
+        if source_type == "视频文件":
+            frame_skip, ok = QInputDialog.getInt(
+                self,
+                "检测间隔",
+                "每隔多少帧检测一次 (1为逐帧检测):",
+                value=1,
+                min=1,
+                max=60
+            )
+            if not ok:
+                return
+                
+        if self.is_detecting:
+            self.stop_detection()
+        self.detection_thread.set_video_source(source, frame_skip)
+        self.start_detection('video')
+        
+    def on_detection_finished(self):
+        """检测线程自行结束（如视频读取完毕）时恢复界面状态"""
+        if self.is_detecting and self.detect_mode == 'video':
+            self.stop_detection()
+            
+    def start_detection(self, mode, windows=None):
+        """开始检测，窗口模式下 windows 为 [(hwnd, 标题)]"""
         self.is_detecting = True
         self.detect_mode = mode
         
@@ -515,12 +1156,19 @@ class YoloDetector(QMainWindow):
             self.btn_fullscreen.setText('停止检测')
             self.log_message("开始全屏检测...")
             self.detection_thread.set_mode('fullscreen')
+            self.detection_thread.set_rois(self.rois)
         elif mode == 'window':
             self.btn_window.setText('停止检测')
-            self.log_message(f"开始窗口检测: {title}")
-            self.detection_thread.set_window_title(title)
-            self.detection_thread.set_mode('window', hwnd)
+            titles = "、".join(title for _, title in windows)
+            self.log_message(f"开始窗口检测: {titles}")
+            self.detection_thread.set_windows(windows)
+            self.detection_thread.set_mode('window', windows[0][0])
+        elif mode == 'video':
+            self.btn_video.setText('停止检测')
+            self.detection_thread.set_mode('video')
             
+        self.update_roi_selection()
+        self._first_detection_start = time.perf_counter()
         self.detection_thread.start()
         
     def stop_detection(self):
@@ -536,11 +1184,61 @@ class YoloDetector(QMainWindow):
             self.detection_thread.stop()
             self.detection_thread.wait()
             
+        self.update_roi_selection()
         self.btn_fullscreen.setText('全屏检测')
         self.btn_window.setText('窗口检测')
+        self.btn_video.setText('视频检测')
         self.fps_label.setText("FPS: --")
+        self.frame_overruns = 0
+        self.dropped_frames = 0
+        self.skip_ratio = None
         self.log_message("检测已停止")
         
+    def on_monitor_changed(self, index):
+        """切换全屏检测的显示器"""
+        self.selected_monitor = self.monitor_combo.itemData(index)
+        # 检测区域是按之前的显示器框选的，切换后清除
+        self.clear_rois()
+        if self.detection_thread:
+            self.detection_thread.set_monitor(self.selected_monitor)
+        self.update_roi_selection()
+        
+    def update_roi_selection(self):
+        """只有全屏检测单个画面时才允许框选检测区域"""
+        enabled = (self.is_detecting and self.detect_mode == 'fullscreen'
+                   and self.selected_monitor != ALL_MONITORS)
+        self.display_label.set_selection_enabled(enabled)
+        self.display_label.setToolTip("拖拽框选检测区域，右键清除所有区域" if enabled else "")
+        
+    def add_roi(self, rect):
+        """将预览中框选的区域换算为屏幕坐标并加入检测区域"""
+        screen_region = self.detection_thread.screen_region if self.detection_thread else None
+        pixmap = self.display_label.pixmap()
+        if not screen_region or pixmap is None or pixmap.isNull():
+            return
+            
+        # 全屏单画面模式下预览始终对应整个所选屏幕
+        scale_x = screen_region['width'] / pixmap.width()
+        scale_y = screen_region['height'] / pixmap.height()
+        roi = {
+            "left": screen_region['left'] + int(rect.x() * scale_x),
+            "top": screen_region['top'] + int(rect.y() * scale_y),
+            "width": int(rect.width() * scale_x),
+            "height": int(rect.height() * scale_y)
+        }
+        self.rois.append(roi)
+        self.detection_thread.set_rois(self.rois)
+        self.log_message(f"已添加检测区域: ({roi['left']}, {roi['top']}) "
+                         f"{roi['width']}x{roi['height']}")
+        
+    def clear_rois(self):
+        """清除所有检测区域"""
+        if not self.rois:
+            return
+        self.rois = []
+        if self.detection_thread:
+            self.detection_thread.set_rois(self.rois)
+            
     def detect_image(self):
         """检测图片"""
         if self.model is None:
@@ -578,30 +1276,126 @@ class YoloDetector(QMainWindow):
             else:
                 self.log_message("无法加载图片，请检查文件格式")
                 
+    def update_preview_size(self):
+        """把显示区域大小告知检测线程，由检测线程输出缩小后的预览帧"""
+        if self.detection_thread:
+            size = self.display_label.contentsRect().size()
+            self.detection_thread.set_preview_size(size.width(), size.height())
+            
+    def resizeEvent(self, event):
+        """窗口大小变化时更新预览尺寸"""
+        super().resizeEvent(event)
+        self.update_preview_size()
+        
     def display_frame(self, frame, detected_labels=None):
-        """显示检测结果帧"""
+        """接收检测结果帧，界面繁忙时合并绘制请求，只绘制最新的一帧"""
+        self._pending_frame = (frame, detected_labels)
+        if not self._paint_scheduled:
+            self._paint_scheduled = True
+            QTimer.singleShot(0, self.paint_pending_frame)
+            
+    def paint_pending_frame(self):
+        """绘制最新的检测结果帧，完成后通知检测线程可以发送下一帧"""
+        self._paint_scheduled = False
+        if self._pending_frame is None:
+            return
+        frame, detected_labels = self._pending_frame
+        self._pending_frame = None
+        
+        paint_start = time.perf_counter()
+        try:
+            self.show_frame(frame, detected_labels)
+            if self._first_detection_start is not None:
+                self.log_first_detection()
+        finally:
+            if self.detection_thread:
+                self.detection_thread.record_paint(paint_start)
+                self.detection_thread.frame_consumed()
+                
+    def log_first_detection(self):
+        """记录开始检测到显示第一帧检测结果的耗时"""
+        message = f"首帧检测耗时: {(time.perf_counter() - self._first_detection_start) * 1000:.0f}ms"
+        if not self._first_detection_logged:
+            self._first_detection_logged = True
+            message += f"（启动后 {time.perf_counter() - self.start_time:.2f}s）"
+        self.log_message(message)
+        self._first_detection_start = None
+                
+    def show_frame(self, frame, detected_labels=None):
+        """在显示区域绘制一帧"""
         if detected_labels is not None:
             self.update_labels_display(detected_labels)
             
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        # 直接用BGR数据构建QImage，先缩放再转为QPixmap，避免额外的颜色转换和全尺寸拷贝
+        frame = np.ascontiguousarray(frame)
         h, w, ch = frame.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        pixmap = QPixmap.fromImage(qt_image)
-        
-        # 获取显示标签的实际大小并保持纵横比
-        label_size = self.display_label.size()
-        scaled_pixmap = pixmap.scaled(
-            label_size.width(),
-            label_size.height(),
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation
-        )
+        qt_image = QImage(frame.data, w, h, frame.strides[0], QImage.Format_BGR888)
+        
+        # 检测线程已按显示区域（不含边框）缩小预览帧，放得下时直接显示，只在放不下时缩小
+        target = self.display_label.contentsRect().size()
+        if w > target.width() or h > target.height():
+            qt_image = qt_image.scaled(target, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        scaled_pixmap = QPixmap.fromImage(qt_image)
+        if self.perf_overlay:
+            self.draw_perf_overlay(scaled_pixmap)
         
         self.display_label.setPixmap(scaled_pixmap)
         
+    def update_source_labels(self, source_labels):
+        """多画面检测时按画面分别显示标签统计"""
+        self.source_labels = source_labels
+        
+    def show_perf_panel(self):
+        """显示各阶段耗时的性能面板"""
+        if self.perf_panel is None:
+            self.perf_panel = PerfPanel(
+                lambda: self.detection_thread.stage_timings if self.detection_thread else None,
+                self.perf_overlay, self)
+            self.perf_panel.overlay_toggled.connect(self.set_perf_overlay)
+        self.perf_panel.show()
+        self.perf_panel.raise_()
+        
+    def set_perf_overlay(self, enabled):
+        self.perf_overlay = enabled
+        self._overlay_time = 0.0
+        
+    def draw_perf_overlay(self, pixmap):
+        """在预览画面左上角叠加各阶段耗时，每0.5秒更新一次文本"""
+        now = time.perf_counter()
+        if now - self._overlay_time >= 0.5 and self.detection_thread:
+            self._overlay_lines = format_overlay(self.detection_thread.stage_timings.summary())
+            self._overlay_time = now
+        if not self._overlay_lines:
+            return
+            
+        painter = QPainter(pixmap)
+        painter.setFont(QFont("Microsoft YaHei", 9))
+        line_height = painter.fontMetrics().height()
+        width = max(painter.fontMetrics().width(line) for line in self._overlay_lines) + 12
+        painter.fillRect(4, 4, width, line_height * len(self._overlay_lines) + 8,
+                         QColor(0, 0, 0, 160))
+        painter.setPen(QColor(0, 255, 0))
+        for index, line in enumerate(self._overlay_lines):
+            painter.drawText(10, 8 + line_height * (index + 1) - painter.fontMetrics().descent(), line)
+        painter.end()
+        
+    def update_track_summary(self, summary):
+        """跟踪模式下更新各类别的目标数"""
+        self.track_summary = summary
+        
     def update_labels_display(self, labels):
         """更新检测到的标签显示"""
+        if self.track_summary is not None:
+            self.update_track_summary_display(self.track_summary)
+            self.track_summary = None
+            self.source_labels = None
+            return
+            
+        if self.source_labels:
+            self.update_grouped_labels_display(self.source_labels)
+            self.source_labels = None
+            return
+            
         if not labels:
             self.labels_area.setText("未检测到目标")
             return
@@ -616,6 +1410,35 @@ class YoloDetector(QMainWindow):
         
         self.labels_area.setText(html)
         
+    def update_track_summary_display(self, summary):
+        """跟踪模式下按目标而不是按帧统计：显示当前和累计跟踪到的目标数"""
+        if not summary:
+            self.labels_area.setText("未检测到目标")
+            return
+            
+        html = "<div style='line-height: 1.5;'>"
+        for label, current, total in summary:
+            html += f"<div><b>{label}</b>: 当前 {current} 个，累计 {total} 个</div>"
+        html += "</div>"
+        
+        self.labels_area.setText(html)
+        
+    def update_grouped_labels_display(self, source_labels):
+        """按画面分组显示标签统计"""
+        from collections import Counter
+        
+        html = "<div style='line-height: 1.5;'>"
+        for name, labels in source_labels:
+            html += f"<div style='margin-top: 6px;'><b>[{name}]</b></div>"
+            if not labels:
+                html += "<div>未检测到目标</div>"
+                continue
+            for label, count in Counter(labels).items():
+                html += f"<div><b>{label}</b>: {count}次</div>"
+        html += "</div>"
+        
+        self.labels_area.setText(html)
+        
     def closeEvent(self, event):
         """关闭窗口事件"""
         if self.is_detecting:
@@ -626,6 +1449,14 @@ class YoloDetector(QMainWindow):
             self.install_thread.stop()
             self.install_thread.wait()
             
+        # 模型加载无法中断，等待其结束
+        for thread in (self.ml_import_thread, self.model_load_thread, self.imgsz_benchmark_thread):
+            if thread and thread.isRunning():
+                thread.wait()
+                
+        if self.metrics_server:
+            self.metrics_server.stop()
+            
         self.log_message("程序已关闭")
         event.accept()
 
@@ -639,6 +1470,7 @@ class YoloDetector(QMainWindow):
                 try:
                     system_cuda = float(system_cuda_str)
                     if not self.check_pytorch_cuda_compatibility(system_cuda_str):
+                        import torch
                         reply = QMessageBox.question(
                             self,
                             "PyTorch CUDA版本不匹配",
@@ -660,6 +1492,8 @@ class YoloDetector(QMainWindow):
         """
         检查 PyTorch 和 CUDA 版本是否匹配（简化版本）
         """
+        import torch
+        
         # 检查是否有可用的 CUDA 设备
         if torch.cuda.is_available():
             self.log_message("CUDA 设备可用，将使用 GPU 进行计算")
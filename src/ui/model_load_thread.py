@@ -0,0 +1,90 @@
+import time
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+from ..core.model_loader import load_model
+from ..core.imgsz_tuner import DEFAULT_IMGSZ, benchmark_imgsz
+from ..utils.cuda_utils import check_cuda
+
+class MLImportThread(QThread):
+    """在后台导入 torch 和 ultralytics 并检查CUDA，避免阻塞界面显示"""
+    ready = pyqtSignal(bool, float)  # CUDA是否可用，导入耗时（秒）
+    failed = pyqtSignal(str)  # 发送错误信息
+
+    def run(self):
+        try:
+            start_time = time.perf_counter()
+            is_cuda_available = check_cuda()
+            import ultralytics  # noqa: F401
+            self.ready.emit(is_cuda_available, time.perf_counter() - start_time)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class ModelLoadThread(QThread):
+    progress = pyqtSignal(str)  # 发送进度信息
+    loaded = pyqtSignal(dict)  # 发送加载结果
+    failed = pyqtSignal(str)  # 发送错误信息
+
+    def __init__(self, model_path, config, cache, warmup_shape=(1080, 1920, 3),
+                 benchmark=False):
+        super().__init__()
+        self.model_path = model_path
+        self.config = dict(config)
+        self.cache = cache
+        self.warmup_shape = warmup_shape
+        self.benchmark = benchmark
+
+    def run(self):
+        try:
+            start_time = time.perf_counter()
+            self.progress.emit(f"正在加载模型: {self.model_path}")
+            model, backend, precision = load_model(
+                self.model_path,
+                self.config['backend'],
+                self.config['num_threads'],
+                log=self.progress.emit,
+                precision=self.config['precision'],
+                cache=self.cache,
+                calibration_dir=self.config['calibration_dir'])
+            load_time = time.perf_counter() - start_time
+
+            # 用采集尺寸的空白帧预热，首帧检测不再承担初始化开销
+            self.progress.emit("正在预热模型...")
+            imgsz = self.config['imgsz'] if self.config['imgsz'] != 'auto' else DEFAULT_IMGSZ
+            warmup_start = time.perf_counter()
+            model(np.zeros(self.warmup_shape, dtype=np.uint8), imgsz=imgsz, verbose=False)
+            warmup_time = time.perf_counter() - warmup_start
+
+            timings = None
+            if self.benchmark:
+                self.progress.emit("正在测试各推理尺寸的耗时...")
+                timings = benchmark_imgsz(model, frame_shape=self.warmup_shape)
+
+            self.loaded.emit({
+                "model": model,
+                "model_path": self.model_path,
+                "backend": backend,
+                "precision": precision,
+                "load_time": load_time,
+                "warmup_time": warmup_time,
+                "timings": timings,
+            })
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class ImgszBenchmarkThread(QThread):
+    """在后台测量各推理尺寸的耗时，调用方需保证测试期间没有其他线程使用该模型"""
+    done = pyqtSignal(dict)  # {尺寸: 秒}
+    failed = pyqtSignal(str)  # 发送错误信息
+
+    def __init__(self, model, frame_shape=(1080, 1920, 3)):
+        super().__init__()
+        self.model = model
+        self.frame_shape = frame_shape
+
+    def run(self):
+        try:
+            self.done.emit(benchmark_imgsz(self.model, frame_shape=self.frame_shape))
+        except Exception as e:
+            self.failed.emit(str(e))
@@ -0,0 +1,66 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QTableWidget, QTableWidgetItem,
+                             QHeaderView, QLabel, QCheckBox)
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from ..core.stage_timer import STAGES, STAGE_NAMES, find_bottleneck
+
+class PerfPanel(QDialog):
+    """性能面板：每秒刷新各阶段最近耗时的 p50/p95/p99，并指出最慢的一组阶段"""
+    overlay_toggled = pyqtSignal(bool)  # 是否在预览画面上叠加显示
+
+    COLUMNS = ["阶段", "次数", "p50 (ms)", "p95 (ms)", "p99 (ms)", "最大 (ms)"]
+
+    def __init__(self, get_timings, overlay=False, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("性能面板")
+        self.setGeometry(220, 220, 520, 380)
+        self.get_timings = get_timings  # 返回当前检测线程的 StageTimings，没有时返回None
+
+        layout = QVBoxLayout()
+        self.table = QTableWidget(len(STAGES), len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        for row, stage in enumerate(STAGES):
+            self.table.setItem(row, 0, QTableWidgetItem(STAGE_NAMES[stage]))
+        layout.addWidget(self.table)
+
+        self.bottleneck_label = QLabel("暂无数据")
+        layout.addWidget(self.bottleneck_label)
+
+        self.overlay_check = QCheckBox("在预览画面上显示")
+        self.overlay_check.setChecked(overlay)
+        self.overlay_check.toggled.connect(self.overlay_toggled.emit)
+        layout.addWidget(self.overlay_check)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.timer.start(1000)
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    def refresh(self):
+        timings = self.get_timings()
+        summary = timings.summary() if timings is not None else {}
+        for row, stage in enumerate(STAGES):
+            stats = summary.get(stage)
+            values = ["-"] * 5 if stats is None else [
+                str(stats['count']), f"{stats['p50']:.2f}", f"{stats['p95']:.2f}",
+                f"{stats['p99']:.2f}", f"{stats['max']:.2f}"]
+            for column, value in enumerate(values, start=1):
+                item = QTableWidgetItem(value)
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+        bottleneck = find_bottleneck(summary)
+        if bottleneck is None:
+            self.bottleneck_label.setText("暂无数据")
+        else:
+            self.bottleneck_label.setText(f"最慢的环节: {bottleneck[0]}（p50 合计 {bottleneck[1]:.1f} ms）")
@@ -2,9 +2,9 @@ from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QProgressBar
 from PyQt5.QtCore import Qt
 
 class ProgressDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, title="安装进度"):
         super().__init__(parent)
-        self.setWindowTitle("安装进度")
+        self.setWindowTitle(title)
         self.setFixedSize(300, 100)
         self.setWindowFlags(Qt.Window | Qt.CustomizeWindowHint | Qt.WindowTitleHint)
         
@@ -0,0 +1,68 @@
+from PyQt5.QtWidgets import QLabel, QRubberBand
+from PyQt5.QtCore import Qt, QRect, QPoint, QSize, pyqtSignal
+
+class RoiLabel(QLabel):
+    """支持鼠标拖拽框选检测区域的预览标签"""
+    roi_selected = pyqtSignal(QRect)  # 框选区域，坐标相对于当前显示的图像
+    roi_cleared = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.selection_enabled = False
+        self._origin = None
+        self._rubber_band = QRubberBand(QRubberBand.Rectangle, self)
+
+    def set_selection_enabled(self, enabled):
+        """启用或禁用区域框选"""
+        self.selection_enabled = enabled
+        if not enabled:
+            self._origin = None
+            self._rubber_band.hide()
+
+    def pixmap_rect(self):
+        """返回当前图像在标签中的显示区域"""
+        pixmap = self.pixmap()
+        if pixmap is None or pixmap.isNull():
+            return QRect()
+        contents = self.contentsRect()
+        x = contents.x() + (contents.width() - pixmap.width()) // 2
+        y = contents.y() + (contents.height() - pixmap.height()) // 2
+        return QRect(QPoint(x, y), pixmap.size())
+
+    def mousePressEvent(self, event):
+        """左键开始框选，右键清除所有区域"""
+        if not self.selection_enabled:
+            super().mousePressEvent(event)
+            return
+
+        if event.button() == Qt.RightButton:
+            self.roi_cleared.emit()
+        elif event.button() == Qt.LeftButton:
+            self._origin = event.pos()
+            self._rubber_band.setGeometry(QRect(self._origin, QSize()))
+            self._rubber_band.show()
+        event.accept()
+
+    def mouseMoveEvent(self, event):
+        """更新框选范围"""
+        if self._origin is None:
+            super().mouseMoveEvent(event)
+            return
+        self._rubber_band.setGeometry(QRect(self._origin, event.pos()).normalized())
+        event.accept()
+
+    def mouseReleaseEvent(self, event):
+        """结束框选并发送图像坐标下的区域"""
+        if self._origin is None or event.button() != Qt.LeftButton:
+            super().mouseReleaseEvent(event)
+            return
+
+        image_rect = self.pixmap_rect()
+        rect = QRect(self._origin, event.pos()).normalized() & image_rect
+        self._origin = None
+        self._rubber_band.hide()
+
+        # 忽略误触产生的过小区域
+        if rect.width() > 4 and rect.height() > 4:
+            self.roi_selected.emit(rect.translated(-image_rect.topLeft()))
+        event.accept()
@@ -1,2 +1,3 @@
 from .window_utils import get_window_list, get_window_rect
-from .cuda_utils import get_cuda_version, install_pytorch, uninstall_pytorch 
\ No newline at end of file
+from .cuda_utils import check_cuda, get_cuda_version, install_pytorch, uninstall_pytorch
+from .monitor_utils import get_monitor_list, ALL_MONITORS
\ No newline at end of file
@@ -2,6 +2,19 @@ import subprocess
 import sys
 import re
 
+def check_cuda():
+    """检查CUDA是否可用并打印相关信息（首次调用时导入torch，耗时较长）"""
+    import torch
+    if torch.cuda.is_available():
+        cuda_version = torch.version.cuda
+        device_name = torch.cuda.get_device_name(0)
+        print(f"CUDA 可用 - 版本: {cuda_version}")
+        print(f"GPU 设备: {device_name}")
+        return True
+    else:
+        print("CUDA 不可用 - 使用 CPU 模式")
+        return False
+
 def get_cuda_version():
     """获取CUDA版本"""
     try:
@@ -0,0 +1,37 @@
+import os
+import glob
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+def read_image(path):
+    """读取图片，支持中文路径，失败时返回None"""
+    try:
+        data = np.fromfile(path, dtype=np.uint8)
+        return cv2.imdecode(data, cv2.IMREAD_COLOR)
+    except Exception:
+        return None
+
+def write_image(path, image):
+    """保存图片，支持中文路径"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    ext = os.path.splitext(path)[1] or '.jpg'
+    ok, data = cv2.imencode(ext, image)
+    if not ok:
+        return False
+    data.tofile(path)
+    return True
+
+def find_images(source):
+    """查找图片文件，source 可以是目录（递归查找）或通配符，返回排序后的路径列表"""
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.append(os.path.join(root, name))
+    else:
+        paths = [path for path in glob.glob(source, recursive=True)
+                 if path.lower().endswith(IMAGE_EXTENSIONS)]
+    return sorted(paths)
@@ -0,0 +1,89 @@
+import sys
+import time
+import threading
+import importlib._bootstrap as _bootstrap
+
+class ImportProfiler:
+    """统计每个模块的导入耗时，输出格式与 python -X importtime 相同
+
+    通过替换 importlib 的 _find_and_load 实现，只统计首次导入；
+    后台线程中的导入按线程分别统计
+    """
+
+    def __init__(self):
+        self.records = []  # [(线程名, 深度, 模块名, 自身耗时us, 累计耗时us)]，按导入完成顺序
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._original = None
+
+    def install(self):
+        if self._original is not None:
+            return
+        self._original = _bootstrap._find_and_load
+        original = self._original
+
+        def _find_and_load(name, import_):
+            stack = self._stack()
+            stack.append(0.0)  # 子模块的累计耗时
+            start = time.perf_counter()
+            try:
+                return original(name, import_)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                with self._lock:
+                    self.records.append((threading.current_thread().name, len(stack), name,
+                                         int((elapsed - children) * 1e6), int(elapsed * 1e6)))
+
+        _bootstrap._find_and_load = _find_and_load
+
+    def uninstall(self):
+        if self._original is not None:
+            _bootstrap._find_and_load = self._original
+            self._original = None
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def format(self, top=20):
+        """返回导入耗时报告：先按线程列出 importtime 格式的明细，再列出耗时最多的顶层导入"""
+        with self._lock:
+            records = list(self.records)
+
+        lines = []
+        threads = []
+        for record in records:
+            if record[0] not in threads:
+                threads.append(record[0])
+        for thread in threads:
+            lines.append(f"# 线程: {thread}")
+            lines.append("import time: self [us] | cumulative | imported package")
+            for name_of_thread, depth, name, self_us, cumulative_us in records:
+                if name_of_thread == thread:
+                    lines.append(f"import time: {self_us:>9} | {cumulative_us:>10} | "
+                                 f"{'  ' * depth}{name}")
+
+        # 同一线程中重复出现的顶层模块（如循环导入）合并统计
+        roots = {}
+        for thread, depth, name, _, cumulative_us in records:
+            if depth == 0:
+                roots[(thread, name)] = roots.get((thread, name), 0) + cumulative_us
+        ranked = sorted(roots.items(), key=lambda item: item[1], reverse=True)
+        total = sum(roots.values())
+        lines.append(f"# 顶层导入共 {total / 1e6:.2f}s，耗时最多的 {min(top, len(ranked))} 个:")
+        for (thread, name), cumulative_us in ranked[:top]:
+            lines.append(f"#   {cumulative_us / 1e6:8.3f}s  {name}  ({thread})")
+        return "\n".join(lines)
+
+    def dump(self, path=None):
+        """输出报告，path 为空或 '-' 时输出到标准错误"""
+        report = self.format()
+        if not path or path == '-':
+            print(report, file=sys.stderr)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(report + "\n")
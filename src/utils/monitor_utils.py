@@ -0,0 +1,18 @@
+import mss
+
+ALL_MONITORS = -1  # 分别采集每个物理显示器
+
+def get_monitor_list():
+    """获取显示器列表，返回 [(索引, 描述)]，索引0为所有显示器合并的虚拟屏幕"""
+    try:
+        with mss.mss() as screen:
+            monitors = screen.monitors
+    except Exception:
+        return [(0, "全部显示器（合并）")]
+
+    items = [(0, "全部显示器（合并）")]
+    for idx, monitor in enumerate(monitors[1:], start=1):
+        items.append((idx, f"显示器 {idx}: {monitor['width']}x{monitor['height']}"))
+    if len(monitors) > 2:
+        items.append((ALL_MONITORS, "全部显示器（分别检测）"))
+    return items
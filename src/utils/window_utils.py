@@ -1,8 +1,15 @@
-import win32gui
-import win32con
+try:
+    import win32gui
+    import win32con
+except ImportError:
+    # 非Windows平台（如无界面运行基准测试）没有pywin32，窗口检测不可用
+    win32gui = None
 
 def get_window_list():
     """获取所有可见窗口的列表"""
+    if win32gui is None:
+        return []
+        
     def callback(hwnd, windows):
         if win32gui.IsWindowVisible(hwnd):
             title = win32gui.GetWindowText(hwnd)
@@ -16,6 +23,9 @@ def get_window_list():
 
 def get_window_rect(hwnd):
     """获取窗口的位置和大小"""
+    if win32gui is None:
+        return None
+        
     try:
         # 获取窗口位置
         rect = win32gui.GetWindowRect(hwnd)